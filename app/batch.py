@@ -0,0 +1,288 @@
+import argparse
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from config.store import load_config
+from db.pool import get_pool, DEFAULT_POOL_SIZE
+from db.schema import get_database_schema
+from db.schema_cache import get_cached_schema
+from db.executor import execute_query
+from llm.cache import get_response_cache, cache_key
+from llm.providers import ProviderRegistry
+from llm.schema_index import SchemaIndex, DEFAULT_TOP_K, DEFAULT_TOKEN_BUDGET
+from llm.propmt import build_prompt
+from llm.generator import NVIDIA_MODEL, DEFAULT_OLLAMA_MODEL
+from utils.sql_cleaner import extract_sql
+from utils.sql_lexer import split_statements, is_read_only
+
+DEFAULT_BATCH_CONCURRENCY = 4   # questions in flight against the LLM at once
+DEFAULT_BATCH_MAX_ROWS = 1000   # rows kept per statement in the output file
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(
+        prog="snapbase batch",
+        description="Answer a file of natural-language questions without the interactive menu"
+    )
+    parser.add_argument("--profile", required=True,
+                        help="saved profile as user@host or its number in the profile list")
+    parser.add_argument("--database", required=True)
+    parser.add_argument("--input", required=True,
+                        help="questions: .txt (one per line) or .jsonl ({\"id\": ..., \"question\": ...})")
+    parser.add_argument("--output", required=True, help="results .jsonl, appended to and resumed from")
+    parser.add_argument("--concurrency", type=int, help="LLM requests in flight at once")
+    parser.add_argument("--provider", choices=("nvidia", "ollama"), help="override the configured LLM provider")
+    parser.add_argument("--max-rows", type=int, help="rows kept per statement")
+    parser.add_argument("--allow-writes", action="store_true",
+                        help="also execute statements that modify data (read-only by default)")
+    parser.add_argument("--restart", action="store_true", help="ignore existing results and start over")
+    return parser.parse_args(argv)
+
+
+def find_profile(config, name):
+    profiles = config.get("db_profiles", [])
+    if name.isdigit() and 1 <= int(name) <= len(profiles):
+        return profiles[int(name) - 1]
+    for profile in profiles:
+        if f"{profile['user']}@{profile['host']}" == name:
+            return profile
+    return None
+
+
+def read_questions(path):
+    """``[(id, question)]`` from a .jsonl or plain text file.
+
+    Text files skip blank and ``#`` lines and use a hash of the question as
+    id, so a resumed run still matches answers after lines were added,
+    removed or reordered; JSONL lines may carry their own ``id`` (the line
+    number otherwise). Malformed JSONL lines are reported with their line
+    number and skipped.
+    """
+    items = []
+    seen = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if path.endswith(".jsonl"):
+                try:
+                    data = json.loads(line)
+                    question = data["question"]
+                except (ValueError, KeyError, TypeError) as e:
+                    print(f"⚠️ {path}:{number}: skipped, not a JSON object with a \"question\" ({e})")
+                    continue
+                items.append((str(data.get("id", number)), question))
+            else:
+                qid = hashlib.sha256(line.encode("utf-8")).hexdigest()[:12]
+                seen[qid] = seen.get(qid, 0) + 1
+                if seen[qid] > 1:  # the same question again is answered again
+                    qid = f"{qid}-{seen[qid]}"
+                items.append((qid, line))
+    return items
+
+
+def completed_ids(path):
+    """Ids already answered in the output file.
+
+    Errors are not counted, so a rerun retries them; a torn last line from
+    an interrupted run is ignored.
+    """
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+                if record["status"] != "error":
+                    done.add(str(record["id"]))
+            except (ValueError, KeyError):
+                continue
+    return done
+
+
+class BatchRunner:
+    """Generates and runs SQL for many questions, writing one JSON line per question"""
+
+    def __init__(self, config, pool, database, schema, provider, output, max_rows, allow_writes):
+        self.config = config
+        self.pool = pool
+        self.database = database
+        self.schema = schema
+        self.index = SchemaIndex(schema) if schema else None
+        self.provider = provider
+        self.model = config.get("ollama_model", DEFAULT_OLLAMA_MODEL) if provider == "ollama" else NVIDIA_MODEL
+        self.providers = ProviderRegistry(config, config.get("api_key"), provider)
+        self.cache = get_response_cache(config)
+        self.output = output
+        self.max_rows = max_rows
+        self.allow_writes = allow_writes
+        self.lock = threading.Lock()
+        self.total = 0
+        self.done = 0
+        self.ok = 0
+        self.failed = 0
+        self.started = time.perf_counter()
+
+    def prompt(self, question):
+        if self.index is None:
+            prompt = build_prompt(question, self.schema)
+            return prompt, prompt
+        _, schema_text, _ = self.index.context(
+            question,
+            top_k=self.config.get("schema_top_k", DEFAULT_TOP_K),
+            token_budget=self.config.get("prompt_token_budget", DEFAULT_TOKEN_BUDGET),
+            prune=self.config.get("schema_pruning", True)
+        )
+        return build_prompt(question, self.schema, schema_text), schema_text
+
+    def answer(self, item_id, question):
+        """One output record for a question"""
+        record = {"id": item_id, "question": question, "sql": None, "status": "error", "error": None,
+                  "provider": None, "cached": False, "results": []}
+        start = time.perf_counter()
+
+        prompt, schema_text = self.prompt(question)
+        key = cache_key(question, self.provider, self.model, schema_text)
+        sql = self.cache.get(key)[0] if self.cache is not None else None
+        if sql:
+            record["cached"] = True
+        else:
+            raw_output, record["provider"] = self.providers.generate(prompt)
+            sql = extract_sql(raw_output)
+        record["llm_time"] = round(time.perf_counter() - start, 3)
+        if not sql:
+            record["error"] = "no SQL in LLM output" if record["provider"] else "no LLM provider answered"
+            return record
+        record["sql"] = sql
+
+        statements = split_statements(sql)
+        if not self.allow_writes and not all(is_read_only(s) for s in statements):
+            record["status"] = "skipped"
+            record["error"] = "not read-only (use --allow-writes to execute)"
+            return record
+
+        start = time.perf_counter()
+        conn = self.pool.acquire(self.database)
+        try:
+            for statement in statements:
+                result = execute_query(conn, statement, max_rows=self.max_rows,
+                                       timeout=self.config.get("query_timeout") or None, pool=self.pool)
+                truncated = result.has_more
+                rowcount = result.delivered
+                result.close()
+                record["results"].append({
+                    "sql": statement,
+                    "columns": result.columns,
+                    "rows": result.rows,
+                    "rowcount": rowcount,
+                    "truncated": truncated,
+                    "error": result.error,
+                })
+                if not result.ok:
+                    record["error"] = result.error
+                    break
+        finally:
+            self.pool.release(conn)
+        record["db_time"] = round(time.perf_counter() - start, 3)
+
+        if record["error"] is None:
+            record["status"] = "ok"
+            if self.cache is not None and not record["cached"]:
+                self.cache.put(key, sql)
+        return record
+
+    def run_item(self, item, out):
+        item_id, question = item
+        try:
+            record = self.answer(item_id, question)
+        except Exception as e:
+            record = {"id": item_id, "question": question, "status": "error", "error": str(e)}
+
+        with self.lock:
+            out.write(json.dumps(record, default=str) + "\n")
+            out.flush()
+            self.done += 1
+            if record["status"] == "ok":
+                self.ok += 1
+            else:
+                self.failed += 1
+            elapsed = time.perf_counter() - self.started
+            mark = {"ok": "✔", "skipped": "⚠️"}.get(record["status"], "❌")
+            print(f"[{self.done}/{self.total}] {mark} {item_id} {record['status']}"
+                  f" — {self.done / elapsed:.2f} question(s)/s")
+
+    def run(self, items, concurrency):
+        self.total = len(items)
+        self.started = time.perf_counter()
+        with open(self.output, "a", encoding="utf-8") as out:
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                list(executor.map(lambda item: self.run_item(item, out), items))
+        return time.perf_counter() - self.started
+
+
+def run_batch(argv):
+    """Entry point for ``snapbase batch``; returns the process exit code"""
+    args = parse_args(argv)
+    config = load_config()
+    provider = args.provider or config.get("llm_provider", "nvidia")
+
+    profile = find_profile(config, args.profile)
+    if profile is None:
+        print(f"❌ No saved profile {args.profile}")
+        return 2
+    password = profile.get("password") or os.environ.get("SNAPBASE_DB_PASSWORD", "")
+
+    try:
+        items = read_questions(args.input)
+    except OSError as e:
+        print(f"❌ Cannot read {args.input}: {e}")
+        return 2
+    if args.restart and os.path.exists(args.output):
+        os.remove(args.output)
+    done = completed_ids(args.output)
+    todo = [item for item in items if item[0] not in done]
+    if done:
+        print(f"↪ Resuming: {len(items) - len(todo)} of {len(items)} question(s) already answered")
+    if not todo:
+        print("✔ Nothing to do")
+        return 0
+
+    concurrency = max(args.concurrency or config.get("batch_concurrency", DEFAULT_BATCH_CONCURRENCY), 1)
+    # Enough connections that no worker waits on the pool
+    pool_config = dict(config, db_pool_size=max(config.get("db_pool_size", DEFAULT_POOL_SIZE), concurrency))
+    pool = get_pool(profile["host"], profile["user"], password, pool_config)
+    try:
+        conn = pool.acquire(args.database)
+    except Exception as e:
+        print(f"❌ Cannot connect: {e}")
+        return 1
+    try:
+        if config.get("schema_cache", True):
+            schema = get_cached_schema(conn, profile["host"], profile["user"])
+        else:
+            schema = get_database_schema(conn)
+    except Exception as e:
+        print(f"❌ Error loading schema: {e}")
+        pool.release(conn)
+        pool.close()
+        return 1
+    pool.release(conn)
+    print(f"✔ Schema loaded: {schema.summary()}")
+
+    runner = BatchRunner(
+        config, pool, args.database, schema, provider, args.output,
+        max_rows=args.max_rows or config.get("batch_max_rows", DEFAULT_BATCH_MAX_ROWS),
+        allow_writes=args.allow_writes
+    )
+    elapsed = runner.run(todo, concurrency)
+    pool.close()
+
+    print(f"🏁 {runner.done} question(s) in {elapsed:.1f}s ({runner.done / max(elapsed, 1e-9):.2f}/s): "
+          f"{runner.ok} ok, {runner.failed} failed or skipped")
+    return 0 if runner.failed == 0 else 1
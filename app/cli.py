@@ -1,73 +1,631 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout
+
 from utils.separators import sep
 from utils.intent import is_direct_sql
-from llm.propmt import build_prompt
-from llm.generator import generate_sql, generate_sql_with_ollama, test_ollama_connection
-from db.executor import execute_query
+from llm.propmt import build_prompt, estimate_tokens
+from llm.schema_index import SchemaIndex, DEFAULT_TOP_K, DEFAULT_TOKEN_BUDGET
+from llm.generator import NVIDIA_MODEL, DEFAULT_OLLAMA_MODEL
+from llm.providers import ProviderRegistry, hedge_delay, race
+from llm.cache import get_response_cache, cache_key
+from llm.templates import split_question, make_template, fill_template
+from llm.transport import last_timing
+from llm.ollama_generator import describe_stats
+from llm.candidates import generate_candidates, rank_candidates, DEFAULT_CANDIDATE_TEMPERATURE
+from db.executor import execute_query, QueryResult
+from db.result_cache import get_result_cache
+from db.watchdog import Watchdog, POLL_INTERVAL, stopped_message
+from db.explain import explain, DEFAULT_CONFIRM_ROWS
 from utils.sql_cleaner import extract_sql
-from utils.formatter import print_table
+from utils.sql_lexer import split_statements, is_read_only, uses_session_state
+from utils.sql_rewriter import window_sql, statement_limit, has_order_by, returns_one_row
+from utils.formatter import print_table, print_batches
+from utils.exporter import export_result, EXPORT_FORMATS, EXPORT_BATCH_SIZE
+
+# Rows shown per page; :more shows the next page, :all streams the rest
+DISPLAY_ROWS = 20
 
 
+def start_cli(conn, schema, api_key, llm_provider="nvidia", config=None, pool=None, providers=None):
+    """Question loop; pass the session's ProviderRegistry so breaker state survives :switch_db"""
+    config = config or {}
+    pending = None  # result whose cursor is still open for paging
+    last_sql = None  # last statement run, the default for :export
+    vertical = False  # \G: one line per column instead of a table
+    auto_limit = config.get("auto_limit", True)  # LIMIT generated SELECTs to the display window
+    timeout = config.get("query_timeout") or None  # seconds per statement; None means no limit
+    cache = get_response_cache(config)
+    results = get_result_cache(config)  # opt-in cache of SELECT results
+    if providers is None:
+        providers = ProviderRegistry(config, api_key, llm_provider)
+        providers.preload()
+
+    # Built once per schema load; picks the tables each question gets to see
+    index = None
+    if schema:
+        index = SchemaIndex(schema)
+        saved = 100 - 100 * index.compact_tokens // max(index.verbose_tokens, 1)
+        print(f"Schema encoding: ~{index.verbose_tokens} → ~{index.compact_tokens} tokens ({saved}% smaller)")
 
-def start_cli(conn, schema, api_key, llm_provider="nvidia"):
     while True:
         sep()
         user_input = input("SnapBase> ").strip()
         sep()
 
+        # ---------- Paging commands ----------
+        if user_input in (":more", ":all"):
+            if pending is None or not pending.has_more:
+                print("⚠️ No more rows to show")
+            elif isinstance(pending, LimitedResult):
+                pending = page_limited(conn, pending, user_input == ":all", vertical, results, pool, timeout)
+            elif user_input == ":more":
+                start = pending.delivered + 1
+                show_rows(pending, cancellable(conn, pool, pending, lambda: pending.fetch_more(DISPLAY_ROWS)),
+                          vertical, start)
+                show_footer(pending)
+            else:
+                # Rows are drawn while later batches are still being fetched
+                cancellable(conn, pool, pending, lambda: print_batches(
+                    pending.columns, pending.iter_batches(), vertical, pending.delivered + 1))
+                show_footer(pending)
+            continue
+
+        # Anything else needs the connection, so drop the rest of the open result
+        if pending is not None:
+            pending.close()
+            pending = None
+
         if user_input.lower() == "exit":
             return "EXIT"
 
+        # MySQL-style \G terminator: show each row vertically
+        vertical = user_input.endswith("\\G")
+        if vertical:
+            user_input = user_input[:-2].rstrip()
+
         if user_input == ":switch_db":
             return "SWITCH_DB"
 
+        if user_input == ":refresh_schema":
+            return "REFRESH_SCHEMA"
+
+        if user_input == ":providers":
+            print(providers.status())
+            continue
+
+        if user_input in (":limit", ":limit on", ":limit off"):
+            if user_input != ":limit":
+                auto_limit = user_input == ":limit on"
+            print(f"Automatic LIMIT on generated queries: {'on' if auto_limit else 'off'}")
+            continue
+
+        if user_input.split()[0:1] == [":timeout"]:
+            parts = user_input.split()
+            if len(parts) == 2 and parts[1] == "off":
+                timeout = None
+            elif len(parts) == 2:
+                try:
+                    timeout = float(parts[1]) if float(parts[1]) > 0 else None
+                except ValueError:
+                    print("⚠️ Usage: :timeout [seconds|off]")
+                    continue
+            print(f"Statement time limit: {f'{timeout:g}s' if timeout else 'off'} (Ctrl-C cancels a running statement)")
+            continue
+
+        if user_input == ":pool":
+            if pool is None:
+                print("⚠️ Not using a connection pool")
+            else:
+                print(f"Connection pool: {pool.summary()}")
+            continue
+
+        if user_input in (":cache", ":cache clear"):
+            for name, store in (("LLM response", cache), ("Query result", results)):
+                if store is None:
+                    print(f"⚠️ {name} cache is disabled")
+                elif user_input == ":cache clear":
+                    store.clear()
+                    print(f"✔ {name} cache cleared")
+                else:
+                    print(f"{name} cache: {store.stats()}")
+            continue
+
+        if user_input.startswith(":export"):
+            export_command(conn, user_input, last_sql, config, pool)
+            continue
+
+        cached_key = None  # set when a fresh LLM answer should be cached
+
         # ---------- CASE 1: Direct SQL ----------
         if is_direct_sql(user_input):
             sql = user_input
+            generated = False
             print("Detected direct SQL input")
 
         # ---------- CASE 2: Natural Language ----------
         else:
             print("Detected natural language input")
-            
-            # Use appropriate LLM based on provider
-            if llm_provider == "ollama":
-                raw_output = generate_sql_with_ollama(build_prompt(user_input, schema))
-            else:  # NVIDIA provider
-                raw_output = generate_sql(build_prompt(user_input, schema), api_key)
-
-            sql = extract_sql(raw_output)
-            if not sql:
-                print("❌ Could not extract valid SQL from LLM output.")
-                print("LLM response was:")
-                print(raw_output)
-                continue
+            generated = True
+
+            stable_prefix = llm_provider == "ollama" and config.get("ollama_stable_prefix", True)
+            prompt, schema_text = prompt_for(user_input, schema, index, config, stable_prefix)
+            model = model_for(llm_provider, config)
+
+            key = cache_key(user_input, llm_provider, model, schema_text)
+            shape, values = split_question(user_input)
+            template_key = cache_key(shape, llm_provider, model, schema_text, kind="template") if values else None
+
+            sql, tier = cache.get(key) if cache is not None else (None, None)
+            if not sql and cache is not None and template_key:
+                template = cache.get_template(template_key)
+                sql = fill_template(template, user_input) if template else None
+                if sql:
+                    cache.record_template_hit()
+                    tier = f"template, {len(values)} value(s) substituted"
+
+            if sql:
+                print(f"⚡ Cache hit ({tier}), skipped LLM call")
+            elif config.get("llm_candidates", 1) > 1:
+                sql = choose_candidate(providers, prompt, schema, conn, pool, config)
+                if not sql:
+                    print("❌ No valid SQL among the candidates.")
+                    continue
+                cached_key = key if cache is not None else None
+            else:
+                raw_output, used_provider = run_generation(providers, llm_provider, prompt, config)
+
+                timing = last_timing(used_provider)
+                if timing is not None:
+                    print(f"⏱ LLM {timing.summary()}")
+                    if timing.server_stats:
+                        print(f"⏱ {used_provider} {describe_stats(timing.server_stats)}")
+
+                sql = extract_sql(raw_output)
+                if not sql:
+                    print("❌ Could not extract valid SQL from LLM output.")
+                    print("LLM response was:")
+                    print(raw_output)
+                    continue
+                cached_key = key if cache is not None else None
 
         print("\nGenerated SQL:")
         print(sql)
         sep()
 
         # Split multiple SQL statements and execute each
-        sql_statements = [s.strip() for s in sql.split(";") if s.strip()]
-        
-        for single_sql in sql_statements:
-            result = execute_query(conn, single_sql)
-            if isinstance(result, list) and result:
-                # Get headers from cursor
-                try:
-                    cursor = conn.cursor(buffered=True)
-                    cursor.execute(single_sql)
-                    headers = [desc[0] for desc in cursor.description]
-                    cursor.close()
-                    
-                    # Check if result has more than 20 rows
-                    total_rows = len(result)
-                    if total_rows > 20:
-                        print_table(headers, result[:20])
-                        print(f"\n⚠️ Showing 20 of {total_rows} rows. Use LIMIT clause to fetch more rows.")
-                    else:
-                        print_table(headers, result)
-                except Exception as e:
-                    print(f"❌ Error formatting result: {e}")
-                    print(result)
+        sql_statements = split_statements(sql)
+
+        last_sql = sql_statements[-1] if sql_statements else last_sql
+
+        # The LLM rarely bounds its SELECTs; only what fits on screen is fetched
+        originals = {}
+        if generated and auto_limit:
+            sql_statements, originals = limit_statements(sql_statements)
+
+        if generated and config.get("explain_guard", True) and not cost_guard(conn, sql_statements, config):
+            print("❌ Query not run")
+            continue
+
+        if can_run_parallel(sql_statements, pool, config):
+            all_ok = run_parallel(conn, pool, sql_statements, vertical, results, timeout)
+        else:
+            all_ok, pending = run_sequential(conn, sql_statements, vertical, originals, results, pool, timeout)
+
+        # Only answers that actually ran are worth replaying
+        if cached_key is not None and all_ok:
+            cache.put(cached_key, sql)
+            template = make_template(user_input, sql) if template_key else None
+            if template:
+                cache.put_template(template_key, template)
+
+
+def export_command(conn, user_input, last_sql, config, pool=None):
+    """``:export csv|jsonl|parquet path [SQL]`` streams a query straight to a file.
+
+    Without SQL the last statement is run again; only reads are exported,
+    so nothing is written twice.
+    """
+    parts = user_input.split(maxsplit=3)
+    if len(parts) < 3 or parts[1] not in EXPORT_FORMATS:
+        print(f"⚠️ Usage: :export {'|'.join(EXPORT_FORMATS)} <path> [SQL]   (path ending in .gz is compressed)")
+        return
+    fmt, path = parts[1], parts[2]
+    sql = parts[3].strip().rstrip(";") if len(parts) > 3 else last_sql
+    if not sql:
+        print("⚠️ Nothing to export yet. Run a query first or give the SQL after the path")
+        return
+    if not is_read_only(sql):
+        print("⚠️ Only read-only statements can be exported")
+        return
+
+    # max_rows=0 executes and leaves the unbuffered cursor open for streaming.
+    # No time limit: on the server it would cover writing out every row too
+    result = run_statement(conn, pool, sql, max_rows=0)
+    if not result.ok:
+        print(result.error)
+        return
+    if not result.has_rows:
+        print("⚠️ Statement returned no result set")
+        return
+    watchdog = Watchdog(conn, pool)
+    try:
+        watchdog.run(lambda: export_result(result, fmt, path, config.get("export_batch_size", EXPORT_BATCH_SIZE)))
+    except Exception as e:
+        if watchdog.reason == "cancelled":
+            print(f"↪ Export cancelled; {path} was removed")
+        else:
+            print(f"\n❌ Export failed: {e}")
+
+
+class LimitedResult:
+    """Paging state of a statement whose LIMIT was added or tightened.
+
+    Nothing stays open on the server: :more and :all run the original
+    statement again for the next window.
+    """
+
+    has_more = True
+
+    def __init__(self, sql, shown):
+        self.sql = sql
+        self.shown = shown
+
+    def close(self):
+        pass
+
+
+def limit_statements(statements):
+    """Add or tighten a LIMIT of the display window plus one on each SELECT.
+
+    The extra row tells whether more rows exist. Returns ``(statements,
+    originals)``, originals mapping the index of every rewritten statement
+    to its original text. Aggregates without GROUP BY and other SELECTs
+    that return a single row are left as they are.
+    """
+    limited, originals = [], {}
+    for i, statement in enumerate(statements):
+        if returns_one_row(statement):
+            limited.append(statement)
+            continue
+        new_sql, cut = window_sql(statement, 0, DISPLAY_ROWS + 1)
+        if new_sql is not None and cut:
+            originals[i] = statement
+            statement = new_sql
+        limited.append(statement)
+    if originals:
+        print(f"✂ LIMIT {DISPLAY_ROWS + 1} added to {len(originals)} statement(s) (:limit off to fetch everything)")
+    return limited, originals
+
+
+def cost_guard(conn, statements, config):
+    """EXPLAIN generated statements before running them; True to go ahead.
+
+    Plans with full scans, joins without an index, filesorts or temporary
+    tables are reported, with an index suggestion where a scan is filtered
+    on columns that have none. Above explain_confirm_rows estimated rows
+    examined the user is asked first; above explain_refuse_rows (off by
+    default) the input is refused.
+    """
+    confirm_rows = config.get("explain_confirm_rows", DEFAULT_CONFIRM_ROWS)
+    refuse_rows = config.get("explain_refuse_rows")
+    expensive = False
+    for statement in statements:
+        plan = explain(conn, statement, statement_limit(statement))
+        if plan is None:
+            continue
+        if plan.flags() or plan.rows_examined > confirm_rows:
+            print(f"🔍 Plan: {plan.summary()}")
+        for suggestion in plan.suggestions:
+            print(f"💡 An index would help: {suggestion}")
+        if refuse_rows is not None and plan.rows_examined > refuse_rows:
+            print(f"❌ Refused: ~{plan.rows_examined:,} rows examined is over the {refuse_rows:,} row limit")
+            return False
+        expensive = expensive or plan.rows_examined > confirm_rows
+
+    if not expensive:
+        return True
+    answer = input(f"⚠️ Over {confirm_rows:,} rows would be examined. Run it anyway? (yes/no): ").strip().lower()
+    return answer == "yes"
+
+
+def page_limited(conn, limited, everything, vertical=False, cache=None, pool=None, timeout=None):
+    """Show the next window, or all the rest, of a limited statement.
+
+    Returns the paging state for the following :more, or None at the end.
+    """
+    start = limited.shown
+    if start == DISPLAY_ROWS and not has_order_by(limited.sql):
+        # Each page is a new run; without ORDER BY MySQL may return rows in another order
+        print("⚠️ No ORDER BY: pages are fetched by re-running the query with an OFFSET, "
+              "so rows may repeat or be missed. Add ORDER BY for stable pages, or :limit off.")
+    if everything:
+        result = run_statement(conn, pool, window_sql(limited.sql, start)[0], 0, cache, timeout)
+        if result.ok and result.has_rows:
+            cancellable(conn, pool, result, lambda: print_batches(
+                result.columns, result.iter_batches(), vertical, start + 1))
+            show_footer(result)
+        else:
+            show_result(result, vertical)
+        return None
+
+    result = run_statement(conn, pool, window_sql(limited.sql, start, DISPLAY_ROWS + 1)[0], DISPLAY_ROWS, cache, timeout)
+    show_result(result, vertical, start + 1)
+    more = result.has_more
+    result.close()
+    return LimitedResult(limited.sql, start + len(result.rows)) if more else None
+
+
+def run_sequential(conn, statements, vertical=False, originals=None, cache=None, pool=None, timeout=None):
+    """Run statements one after another on the session connection.
+
+    Returns ``(all_ok, pending)``; pending is the last result when it still
+    has rows to page through. ``originals`` maps the index of statements
+    rewritten by limit_statements() to their original text.
+    """
+    originals = originals or {}
+    all_ok = True
+    pending = None
+    for i, single_sql in enumerate(statements):
+        result = run_statement(conn, pool, single_sql, DISPLAY_ROWS, cache, timeout)
+        show_result(result, vertical)
+        all_ok = all_ok and result.ok
+        if not result.has_more:
+            continue
+        if i == len(statements) - 1:
+            if i in originals:
+                result.close()
+                pending = LimitedResult(originals[i], len(result.rows))
             else:
-                print(result)
+                pending = result
+            print("\n⚠️ More rows available. Type :more for the next page or :all for the rest.")
+        else:
+            # The next statement needs the connection, so this one can't stay open
+            result.close()
+            print(f"\n⚠️ Showing first {DISPLAY_ROWS} rows. Use LIMIT clause to fetch more rows.")
+    return all_ok, pending
+
+
+def can_run_parallel(statements, pool, config):
+    """Several independent reads with parallel_statements on and a pool to draw from.
+
+    Anything that writes, locks or depends on session state (user variables,
+    LAST_INSERT_ID(), ...) keeps the whole input sequential on one connection.
+    """
+    if pool is None or len(statements) < 2 or not config.get("parallel_statements", False):
+        return False
+    return all(is_read_only(s) and not uses_session_state(s) for s in statements)
+
+
+def run_parallel(conn, pool, statements, vertical=False, cache=None, timeout=None):
+    """Run read-only statements concurrently, one connection each.
+
+    The first statement uses the session connection and the others borrow
+    pooled ones; the pool size bounds the concurrency. Results are shown in
+    input order. Ctrl-C sends KILL QUERY to every statement still running
+    and skips the ones not started yet. Returns True when every statement
+    succeeded.
+    """
+    database = pool.database_of(conn)
+    running = {}        # index -> connection its statement is running on
+    cancelled = threading.Event()
+
+    def run(index, single_sql):
+        """``(result, truncated)`` with the cursor closed so the connection is free"""
+        result = QueryResult(single_sql)
+        if cancelled.is_set():
+            result.error = "↪ Statement cancelled before it started"
+            return result, False
+        if index == 0:
+            worker_conn = conn
+        else:
+            try:
+                worker_conn = pool.acquire(database)
+            except Exception as e:
+                result.error = f"❌ Connection error: {e}"
+                return result, False
+        running[index] = worker_conn
+        try:
+            return first_page(worker_conn, single_sql, cache, timeout, pool)
+        finally:
+            running.pop(index, None)
+            if index != 0:
+                pool.release(worker_conn)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=min(len(statements), max(pool.size, 1))) as executor:
+        futures = [executor.submit(run, i, single_sql) for i, single_sql in enumerate(statements)]
+        try:
+            results = [wait_for(future) for future in futures]
+        except KeyboardInterrupt:
+            print("\n↪ Cancelling the running statements…")
+            cancelled.set()
+            for worker_conn in list(running.values()):
+                pool.kill_query(worker_conn)
+            results = [wait_for(future) for future in futures]
+            for result, _ in results:
+                result.error = stopped_message(result.errno, "cancelled") or result.error
+    elapsed = time.perf_counter() - start
+
+    for result, truncated in results:
+        show_result(result, vertical)
+        if truncated:
+            print(f"\n⚠️ Showing first {DISPLAY_ROWS} rows. Use LIMIT clause to fetch more rows.")
+    sequential = sum(result.total_time for result, _ in results)
+    print(f"⚡ {len(statements)} read-only statements ran in parallel in {elapsed:.3f}s "
+          f"(sum of statement times {sequential:.3f}s)")
+    return all(result.ok for result, _ in results)
+
+
+def wait_for(future):
+    """future.result(), polled so Ctrl-C gets through on Windows too"""
+    while True:
+        try:
+            return future.result(timeout=POLL_INTERVAL)
+        except FuturesTimeout:
+            continue
+
+
+def first_page(conn, sql, cache=None, timeout=None, pool=None):
+    result = execute_query(conn, sql, max_rows=DISPLAY_ROWS, cache=cache, timeout=timeout, pool=pool)
+    truncated = result.has_more
+    result.close()
+    return result, truncated
+
+
+def run_statement(conn, pool, sql, max_rows, cache=None, timeout=None):
+    """execute_query under the session's time limit; Ctrl-C cancels only the statement"""
+    watchdog = Watchdog(conn, pool)
+    result = watchdog.run(lambda: execute_query(conn, sql, max_rows, cache=cache, timeout=timeout, pool=pool))
+    result.error = stopped_message(result.errno, watchdog.reason, timeout) or result.error
+    return result
+
+
+def cancellable(conn, pool, result, action):
+    """Run action(), which reads the rest of result, so Ctrl-C stops it with KILL QUERY"""
+    watchdog = Watchdog(conn, pool)
+    value = watchdog.run(action)
+    result.error = stopped_message(result.errno, watchdog.reason) or result.error
+    return value
+
+
+def run_generation(providers, llm_provider, prompt, config):
+    """Ask the configured provider (or race the first two healthy ones) for SQL.
+
+    Returns ``(raw_output, provider_name)`` naming the provider that answered.
+    """
+    stream = config.get("llm_stream", True)
+    available = providers.available()
+    if not available:
+        print("❌ No LLM provider available (not configured or circuit open). See :providers")
+        return None, llm_provider
+
+    if config.get("llm_race", False) and len(available) > 1:
+        primary, secondary = available[0], available[1]
+        delay = hedge_delay(primary, config)
+        print(f"🏁 Racing {primary.name}, hedging to {secondary.name} after {delay:.2f}s")
+        raw_output, winner, hedged = race(primary, secondary, prompt, delay)
+        if winner:
+            print(f"🏁 {winner} answered first" + (" (hedged)" if hedged else ""))
+        return raw_output, winner or primary.name
+
+    if stream:
+        print("\nLLM output:")
+    raw_output, used = providers.generate(prompt, stream=stream, on_token=echo_token if stream else None)
+    if stream:
+        print()
+    return raw_output, used or llm_provider
+
+
+def choose_candidate(providers, prompt, schema, conn, pool, config):
+    """Ask for several answers, rank them and return the cheapest valid SQL, or None"""
+    available = providers.available()
+    if not available:
+        print("❌ No LLM provider available (not configured or circuit open). See :providers")
+        return None
+
+    provider = available[0]
+    count = config.get("llm_candidates")
+    temperature = config.get("llm_candidate_temperature", DEFAULT_CANDIDATE_TEMPERATURE)
+    print(f"🎲 Asking {provider.name} for {count} candidates")
+    start = time.perf_counter()
+    candidates = generate_candidates(provider, prompt, count, temperature)
+    if not candidates:
+        return None
+
+    ranked = rank_candidates(candidates, schema, conn, pool)
+    rows = [
+        (c.number,
+         f"{c.cost:,.0f}" if c.valid else "-",
+         f"{c.rows_examined:,}" if c.valid else "-",
+         "; ".join(c.problems or c.flags) or "ok",
+         " ".join(c.sql.split()))
+        for c in ranked
+    ]
+    print_table(["#", "cost", "rows examined", "notes", "SQL"], rows)
+    print(f"⏱ {len(candidates)} distinct candidate(s) generated and ranked in {time.perf_counter() - start:.2f}s")
+
+    best = ranked[0]
+    if not best.valid:
+        return None
+    print(f"✔ Running candidate {best.number}")
+    return best.sql
+
+
+def echo_token(token):
+    print(token, end="", flush=True)
+
+
+def model_for(llm_provider, config):
+    if llm_provider == "ollama":
+        return config.get("ollama_model", DEFAULT_OLLAMA_MODEL)
+    return NVIDIA_MODEL
+
+
+def prompt_for(question, schema, index, config, stable_prefix=False):
+    """Build the LLM prompt with only the tables relevant to the question.
+
+    With stable_prefix the whole schema is sent whenever it fits the token
+    budget, keeping the prompt prefix identical for KV-cache reuse.
+    Returns ``(prompt, schema_text)``.
+    """
+    if index is None:
+        prompt = build_prompt(question, schema)
+        return prompt, prompt
+
+    budget = config.get("prompt_token_budget", DEFAULT_TOKEN_BUDGET)
+    prune = config.get("schema_pruning", True)
+    if stable_prefix and index.compact_tokens + len(index.table_text) <= budget:
+        # The whole schema fits: send all of it so the prompt prefix never changes
+        prune = False
+
+    tables, schema_text, tokens = index.context(
+        question,
+        top_k=config.get("schema_top_k", DEFAULT_TOP_K),
+        token_budget=budget,
+        prune=prune
+    )
+    prompt = build_prompt(question, schema, schema_text)
+    print(f"Schema context: {len(tables)}/{len(schema.tables)} tables, ~{tokens} tokens "
+          f"(prompt ~{estimate_tokens(prompt)} tokens, full schema ~{index.compact_tokens})")
+    return prompt, schema_text
+
+
+def show_result(result, vertical=False, start=1):
+    """Render a QueryResult without touching the database again"""
+    if not result.ok and not result.rows:
+        print(result.error)
+        return
+
+    if not result.has_rows:
+        print(result.message)
+    elif not result.rows:
+        print("(no rows)")
+    else:
+        show_rows(result, result.rows, vertical, start)
+
+    show_footer(result)
+
+
+def show_rows(result, rows, vertical=False, start=1):
+    try:
+        print_table(result.columns, rows, vertical, start)
+    except Exception as e:
+        print(f"❌ Error formatting result: {e}")
+        print(rows)
+
+
+def show_footer(result):
+    if result.error:
+        print(result.error)
+    for level, code, msg in result.warnings:
+        print(f"⚠️ {level} {code}: {msg}")
+    if result.cached_age is not None:
+        print(f"⚡ Cached result from {result.cached_age:.0f}s ago, tables unchanged; not run on the server")
+    if result.discarded:
+        print(f"⏱ First {len(result.rows)} row(s) kept, the rest was not read; executed in {result.execute_time:.3f}s, "
+              f"fetched in {result.fetch_time:.3f}s")
+    elif result.has_more:
+        print(f"⏱ {result.rowcount} row(s) read so far, executed in {result.execute_time:.3f}s, fetched in {result.fetch_time:.3f}s")
+    else:
+        print(f"⏱ {result.rowcount} row(s), executed in {result.execute_time:.3f}s, fetched in {result.fetch_time:.3f}s")
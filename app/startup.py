@@ -0,0 +1,69 @@
+import subprocess
+import sys
+import time
+
+from config.store import PROJECT_ROOT
+from utils.formatter import print_table
+
+STARTUP_BUDGET_MS = 100
+TOP_IMPORTS = 15
+# Loaded on first use: opening a profile, asking a question, batch mode
+DEFERRED_MODULES = ("app.cli", "app.batch", "db.pool", "llm.health")
+# None of these should ever be imported before the menu is drawn
+HEAVY_MODULES = ("mysql.connector", "requests", "urllib3", "pyarrow", "sqlite3")
+
+
+def import_times(code):
+    """Run code in a fresh interpreter under ``-X importtime``.
+
+    Returns ``({module: (self_us, cumulative_us)}, wall_ms)``.
+    """
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=PROJECT_ROOT, capture_output=True, text=True
+    )
+    wall = (time.perf_counter() - start) * 1000
+    times = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # the column header
+        times[fields[2].strip()] = (int(fields[0]), int(fields[1]))
+    return times, wall
+
+
+def _top(times, count=TOP_IMPORTS):
+    ranked = sorted(times.items(), key=lambda item: item[1][0], reverse=True)[:count]
+    return [(name, f"{own / 1000:.1f}", f"{total / 1000:.1f}") for name, (own, total) in ranked]
+
+
+def startup_profile():
+    """``snapbase --startup-profile``: where start-up time goes, and what is deferred"""
+    baseline, baseline_wall = import_times("pass")
+    startup, startup_wall = import_times("import main")
+    full, _ = import_times("import main; import " + ", ".join(DEFERRED_MODULES))
+
+    own = {name: t for name, t in startup.items() if name not in baseline}
+    deferred = {name: t for name, t in full.items() if name not in startup}
+    menu_ms = startup.get("main", (0, 0))[1] / 1000
+
+    print(f"Slowest imports before the menu (of {len(own)}, times in ms):")
+    print_table(["module", "self", "cumulative"], _top(own))
+    print(f"\nDeferred until first use ({len(deferred)} modules):")
+    print_table(["module", "self", "cumulative"], _top(deferred))
+
+    deferred_ms = sum(t[0] for t in deferred.values()) / 1000
+    print(f"\n⏱ import main: {menu_ms:.1f}ms; interpreter start-up: {baseline_wall:.0f}ms; "
+          f"to menu: {startup_wall:.0f}ms wall; deferred: {deferred_ms:.1f}ms")
+
+    heavy = sorted(name for name in own if name.split(".")[0] in {m.split(".")[0] for m in HEAVY_MODULES})
+    if heavy:
+        print(f"⚠️ Heavy modules imported before the menu: {', '.join(heavy[:5])}")
+    if menu_ms > STARTUP_BUDGET_MS:
+        print(f"⚠️ Start-up imports take {menu_ms:.0f}ms, over the {STARTUP_BUDGET_MS}ms budget")
+        return 1
+    print(f"✔ Start-up imports within the {STARTUP_BUDGET_MS}ms budget")
+    return 0
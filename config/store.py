@@ -4,6 +4,7 @@ import os
 # Get the absolute path to the config file in the project root
 PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 CONFIG_FILE = os.path.join(PROJECT_ROOT, "snapbase_config.json")
+CACHE_DIR = os.path.join(PROJECT_ROOT, ".snapbase_cache")
 
 DEFAULT_CONFIG = {
     "api_key": None,
@@ -5,7 +5,8 @@ def connect_server(host, user, password):
         host=host,
         user=user,
         password=password,
-        connection_timeout=10
+        connection_timeout=10,
+        get_warnings=True
     )
 
 def connect_database(host, user, password, database):
@@ -14,5 +15,6 @@ def connect_database(host, user, password, database):
         user=user,
         password=password,
         database=database,
-        connection_timeout=10
+        connection_timeout=10,
+        get_warnings=True
     )
\ No newline at end of file
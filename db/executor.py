@@ -1,24 +1,260 @@
+import time
+
 from mysql.connector import Error
 
+from db.result_cache import cacheable_tables, rows_bytes
+from db.watchdog import Watchdog, KILL_GRACE, ER_QUERY_INTERRUPTED, stopped_message
+from utils.sql_rewriter import with_time_limit, statement_limit
+
+# Rows pulled from the server per fetchmany() round
+FETCH_BATCH_SIZE = 500
+# close() reads up to this many leftover rows before resorting to KILL QUERY;
+# a statement whose LIMIT leaves at most CLOSE_DRAIN_LIMITED is always read out
+CLOSE_DRAIN_ROWS = 1000
+CLOSE_DRAIN_LIMITED = 10_000
+
+
+class QueryResult:
+    """Everything a single execution of a statement produced.
+
+    When the statement was run with a row window, ``rows`` only holds that
+    window and the unbuffered cursor stays open so the rest can be paged
+    with fetch_more()/iter_batches() or discarded with close().
+    ``cached_age`` is set (in seconds) when the rows came from a ResultCache.
+
+    ``stop`` is a callable that asks the server to stop sending the result
+    (KILL QUERY), so close() does not have to read the rest of it.
+    """
+
+    def __init__(self, sql):
+        self.sql = sql
+        self.rows = []
+        self.description = None
+        self.rowcount = -1
+        self.warnings = []
+        self.message = None
+        self.error = None
+        self.errno = None
+        self.execute_time = 0.0
+        self.fetch_time = 0.0
+        self.cached_age = None
+        self.stop = None
+        self.discarded = False
+        self._collected = None      # every row read so far, while it fits the cache
+        self._collected_bytes = 0
+        self._collect_limit = 0
+        self._on_complete = None
+        self._cursor = None
+        self._peeked = []
+
+    @property
+    def columns(self):
+        if not self.description:
+            return []
+        return [desc[0] for desc in self.description]
+
+    @property
+    def has_rows(self):
+        return self.description is not None
+
+    @property
+    def has_more(self):
+        return self._cursor is not None
+
+    @property
+    def delivered(self):
+        """Rows handed out so far (read from the server minus the one read ahead)"""
+        return max(self.rowcount, 0) - len(self._peeked)
+
+    @property
+    def ok(self):
+        return self.error is None
+
+    @property
+    def total_time(self):
+        return self.execute_time + self.fetch_time
+
+    def fetch_more(self, count, batch_size=FETCH_BATCH_SIZE):
+        """Read up to count further rows from the open cursor"""
+        rows, self._peeked = self._peeked, []
+        while self._cursor is not None and len(rows) < count:
+            batch = self._fetch_batch(min(batch_size, count - len(rows)))
+            if not batch:
+                break
+            rows.extend(batch)
+        self._peek()
+        return rows
+
+    def iter_batches(self, batch_size=FETCH_BATCH_SIZE):
+        """Yield the remaining rows batch by batch without keeping them"""
+        # The row read ahead opens the first batch rather than being one on
+        # its own: print_batches() sizes the columns from the first batch
+        rows, self._peeked = self._peeked, []
+        while self._cursor is not None:
+            batch = self._fetch_batch(max(batch_size - len(rows), 1))
+            rows.extend(batch)
+            if not batch:
+                break
+            yield rows
+            rows = []
+        if rows:
+            yield rows
+
+    def close(self):
+        """Discard whatever is left of the result so the connection is free again.
+
+        A few leftover rows (all of them when the statement's LIMIT keeps
+        the rest small) are simply read, which is cheaper than a KILL and
+        sends nothing that could reach the connection's next statement.
+        Only when that does not reach the end, and ``stop`` is set, is the
+        server told to stop sending, so a huge result is never read out.
+        """
+        self._peeked = []
+        # A result small enough for the result cache is worth reading to the end
+        while self._cursor is not None and self._collected is not None:
+            if not self._fetch_batch(FETCH_BATCH_SIZE):
+                break
+        budget = CLOSE_DRAIN_ROWS
+        limit = statement_limit(self.sql) if self._cursor is not None else None
+        if limit is not None and limit - max(self.rowcount, 0) <= CLOSE_DRAIN_LIMITED:
+            budget = CLOSE_DRAIN_LIMITED
+        while self._cursor is not None and budget > 0:
+            batch = self._fetch_batch(min(FETCH_BATCH_SIZE, budget))
+            budget -= len(batch)
+            if not batch:
+                break
+        if self._cursor is not None and self.stop is not None:
+            self.discarded = self.stop()
+        while self._cursor is not None:
+            if not self._fetch_batch(FETCH_BATCH_SIZE):
+                break
+
+    def collect(self, limit, on_complete):
+        """Keep every row read, up to ``limit`` bytes, and pass them to
+        on_complete if the result is read to its end without error.
 
-def execute_query(connection, sql):
+        The rows may be read over several pages; close() reads on while
+        they still fit instead of stopping the statement.
+        """
+        self._collected = list(self.rows)
+        self._collected_bytes = rows_bytes(self.rows)
+        self._collect_limit = limit
+        self._on_complete = on_complete
+
+    def _peek(self):
+        # Read one row ahead so has_more is exact at the end of a window
+        if self._cursor is not None and not self._peeked:
+            self._peeked = self._fetch_batch(1)
+
+    def _fetch_batch(self, size):
+        start = time.perf_counter()
+        try:
+            batch = self._cursor.fetchmany(size)
+            self.rowcount = self._cursor.rowcount
+        except Error as e:
+            # The interruption close() asked for is not an error of the statement
+            if not (self.discarded and e.errno == ER_QUERY_INTERRUPTED):
+                self.error = f"❌ SQL Error: {e}"
+                self.errno = e.errno
+            batch = []
+        self.fetch_time += time.perf_counter() - start
+        if batch and self._collected is not None:
+            self._collected.extend(batch)
+            self._collected_bytes += rows_bytes(batch)
+            if self._collected_bytes > self._collect_limit:
+                self._collected = None
+        if not batch:
+            self._finish()
+        return batch
+
+    def _finish(self):
+        cursor, self._cursor = self._cursor, None
+        try:
+            self.rowcount = cursor.rowcount
+            self.warnings = cursor.fetchwarnings() or []
+            cursor.close()
+        except Error:
+            pass
+        collected, self._collected = self._collected, None
+        if collected is not None and self.error is None and not self.discarded:
+            self._on_complete(collected)
+
+
+def execute_query(connection, sql, max_rows=None, batch_size=FETCH_BATCH_SIZE, cache=None,
+                  timeout=None, pool=None):
+    """Run sql once and return a QueryResult with rows and column metadata.
+
+    Rows are streamed from an unbuffered cursor in fetchmany() batches. With
+    max_rows set, reading stops after that many rows and the cursor is left
+    open on the result for paging; the caller must close() it before running
+    anything else on the connection.
+
+    With a ResultCache, cacheable SELECTs are answered from it while their
+    tables are unchanged, and results read to the end (over any number of
+    pages, or by close()) are stored; any other statement drops the cached
+    results of the tables it names.
+
+    With a pool, close() stops an unfinished result with KILL QUERY over
+    the pool's side connection instead of reading it to the end.
+
+    With a timeout (seconds), SELECTs carry a MAX_EXECUTION_TIME hint so the
+    server stops them itself; anything else is stopped by a Watchdog that
+    sends KILL QUERY through the pool's side connection.
+    """
+    result = QueryResult(sql)
+    cursor = None
+    key = versions = None
+    limited = with_time_limit(sql, int(timeout * 1000)) if timeout else None
+    # The watchdog only backs the server up for hinted SELECTs (MariaDB ignores the hint)
+    watchdog = Watchdog(connection, pool, timeout + KILL_GRACE if limited else timeout)
     try:
-        cursor = connection.cursor(buffered=True)
-        cursor.execute(sql)
+        with watchdog:
+            start = time.perf_counter()
+            tables = cacheable_tables(sql) if cache is not None else None
+            found = cache.versions(connection, tables) if tables else None
+            if found:
+                database, versions = found
+                key = cache.key(database, sql)
+                entry = cache.get(key, versions)
+                if entry is not None:
+                    cursor = entry.cursor()
+                    result.cached_age = time.time() - entry.created
+            if cursor is None:
+                cursor = connection.cursor()
+                cursor.execute(limited or sql)
+            result.execute_time = time.perf_counter() - start
 
-        # 🔑 This is the key line
-        if cursor.with_rows:
-            result = cursor.fetchall()
-        else:
-            connection.commit()
-            result = "✔ Query executed successfully"
+            # 🔑 This is the key line
+            if cursor.with_rows:
+                result.description = cursor.description
+                result._cursor = cursor
+                if pool is not None and result.cached_age is None:
+                    result.stop = lambda: pool.kill_query(connection)
+                if key is not None and result.cached_age is None:
+                    result.collect(cache.max_entry_bytes, lambda rows: cache.put(
+                        key, result.description, rows, result.warnings, versions))
+                if max_rows is None:
+                    for batch in result.iter_batches(batch_size):
+                        result.rows.extend(batch)
+                else:
+                    result.rows = result.fetch_more(max_rows, batch_size)
+                result.error = stopped_message(result.errno, watchdog.reason, timeout) or result.error
+                return result
 
-        cursor.close()
-        return result
+            connection.commit()
+            if cache is not None:
+                cache.invalidate_for(sql)
+            result.message = "✔ Query executed successfully"
+            result.rowcount = cursor.rowcount
+            result.warnings = cursor.fetchwarnings() or []
+            cursor.close()
+            return result
 
     except Error as e:
         try:
             cursor.close()
         except:
             pass
-        return f"❌ SQL Error: {e}"
+        result.errno = e.errno
+        result.error = stopped_message(e.errno, watchdog.reason, timeout) or f"❌ SQL Error: {e}"
+        return result
@@ -0,0 +1,153 @@
+import json
+import re
+
+from mysql.connector import Error
+
+from utils.sql_lexer import table_references
+
+DEFAULT_CONFIRM_ROWS = 1_000_000    # estimated rows examined before asking
+FULL_SCAN_MIN_ROWS = 1000           # smaller tables are cheap to scan, not worth flagging
+EXPLAINABLE = ("SELECT", "WITH", "UPDATE", "DELETE", "INSERT", "REPLACE")
+
+_COLUMN_REF_RE = re.compile(r"`([^`]+)`\.`([^`]+)`\.`([^`]+)`")
+
+
+class Plan:
+    """What EXPLAIN FORMAT=JSON says a statement will cost"""
+
+    def __init__(self, sql):
+        self.sql = sql
+        self.cost = 0.0
+        self.rows_examined = 0
+        self.full_scans = []        # [(table, rows per scan)]
+        self.join_buffers = []      # tables joined without an index (hash / block nested loop)
+        self.filesort = False
+        self.temporary = False
+        self.suggestions = []       # CREATE INDEX statements that would avoid a scan
+        self.tables = 0
+        self.aliases = table_references(sql)
+
+    def flags(self):
+        flags = [f"full scan of {table} (~{rows:,} rows)" for table, rows in self.full_scans]
+        flags += [f"{table} joined without an index" for table in self.join_buffers]
+        if self.filesort:
+            flags.append("filesort")
+        if self.temporary:
+            flags.append("temporary table")
+        return flags
+
+    def summary(self):
+        text = f"~{self.rows_examined:,} rows examined, cost {self.cost:,.0f}"
+        flags = self.flags()
+        if flags:
+            text += "; " + ", ".join(flags)
+        return text
+
+
+def _number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _suggest_index(plan, alias, table, info):
+    """Index on this table's columns in the pushed-down condition, if any"""
+    condition = info.get("attached_condition", "")
+    columns = []
+    for _, ref_table, column in _COLUMN_REF_RE.findall(condition):
+        if ref_table == alias and column not in columns:
+            columns.append(column)
+    if not columns or table.startswith("<"):
+        return
+    name = "idx_" + "_".join([table] + columns)[:60]
+    suggestion = f"CREATE INDEX `{name}` ON `{table}` ({', '.join(f'`{c}`' for c in columns)})"
+    if suggestion not in plan.suggestions:
+        plan.suggestions.append(suggestion)
+
+
+def _table(plan, info, prefix):
+    """Account for one table access; returns the rows the join produces so far"""
+    # EXPLAIN names tables by their alias in the query
+    alias = info.get("table_name", "?")
+    table = plan.aliases.get(alias, alias)
+    per_scan = int(_number(info.get("rows_examined_per_scan")))
+    plan.rows_examined += int(per_scan * max(prefix, 1))
+    plan.tables += 1
+
+    access = info.get("access_type")
+    if per_scan >= FULL_SCAN_MIN_ROWS:
+        if access == "ALL":
+            plan.full_scans.append((table, per_scan))
+        if info.get("using_join_buffer"):
+            plan.join_buffers.append(table)
+        if access in ("ALL", "index") or info.get("using_join_buffer"):
+            _suggest_index(plan, alias, table, info)
+
+    for key, value in info.items():
+        if key not in ("table_name", "attached_condition"):
+            _walk(plan, value)
+    return _number(info.get("rows_produced_per_join")) or prefix
+
+
+def _walk(plan, node):
+    if isinstance(node, list):
+        for item in node:
+            _walk(plan, item)
+        return
+    if not isinstance(node, dict):
+        return
+
+    if node.get("using_filesort"):
+        plan.filesort = True
+    if node.get("using_temporary_table"):
+        plan.temporary = True
+
+    for key, value in node.items():
+        if key == "nested_loop":
+            # Each table is scanned once per row produced by the tables before it
+            prefix = 1
+            for item in value:
+                if "table" in item:
+                    prefix = _table(plan, item["table"], prefix)
+                else:
+                    _walk(plan, item)
+        elif key == "table" and isinstance(value, dict):
+            _table(plan, value, 1)
+        else:
+            _walk(plan, value)
+
+
+def explain(conn, sql, limit=None):
+    """Plan for sql from EXPLAIN FORMAT=JSON, or None when it can't be explained.
+
+    With a LIMIT and no sort or temporary table, a single-table read stops
+    early, so its estimate is capped at the rows needed to fill the limit.
+    """
+    words = sql.lstrip("( \n\t").split(None, 1)
+    if not words or words[0].upper() not in EXPLAINABLE:
+        return None
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f"EXPLAIN FORMAT=JSON {sql}")
+        row = cursor.fetchone()
+        cursor.fetchall()
+    except Error:
+        return None
+    finally:
+        cursor.close()
+
+    data = json.loads(row[0])
+    plan = Plan(sql)
+    block = data.get("query_block", {})
+    plan.cost = _number(block.get("cost_info", {}).get("query_cost"))
+    _walk(plan, block)
+
+    if limit is not None and plan.tables == 1 and not (plan.filesort or plan.temporary):
+        table = block.get("table", {})
+        filtered = _number(table.get("filtered")) or 100.0
+        plan.rows_examined = min(plan.rows_examined, int(limit * 100 / filtered))
+        if plan.rows_examined < FULL_SCAN_MIN_ROWS:
+            plan.full_scans = []
+            plan.suggestions = []
+    return plan
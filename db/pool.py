@@ -0,0 +1,278 @@
+import threading
+import time
+
+from mysql.connector.errors import Error, PoolError
+
+from db.connection import connect_server, connect_database
+from db.result_cache import STATS_EXPIRY_SQL
+
+DEFAULT_POOL_SIZE = 4
+DEFAULT_POOL_TIMEOUT = 10   # seconds to wait for a free connection
+DEFAULT_PING_AFTER = 30     # idle seconds after which a connection is pinged before reuse
+ER_NO_SUCH_THREAD = 1094
+
+_pools = {}     # (host, user) -> ConnectionPool
+_pools_lock = threading.Lock()
+
+
+class ConnectionPool:
+    """Reusable connections for one profile (host/user).
+
+    Connections are handed out with acquire() and given back with release().
+    Switching databases reuses a connection with COM_INIT_DB instead of
+    reconnecting; connections that sat idle for a while are pinged before
+    reuse and replaced when the server has dropped them.
+    """
+
+    def __init__(self, host, user, password, size=DEFAULT_POOL_SIZE,
+                 timeout=DEFAULT_POOL_TIMEOUT, ping_after=DEFAULT_PING_AFTER, session_sql=()):
+        self.host = host
+        self.user = user
+        self.password = password
+        self.size = size
+        self.timeout = timeout
+        self.ping_after = ping_after
+        self.session_sql = tuple(session_sql)  # run on every new or reset connection
+        self.idle = []          # [(connection, database, released_at)]
+        self.in_use = {}        # id(connection) -> database
+        self.cond = threading.Condition()
+        self.closed = False
+        self.control = None     # side connection for KILL QUERY, outside the size limit
+        self.control_lock = threading.Lock()
+        self.kills = 0
+        self.created = 0
+        self.reused = 0
+        self.replaced = 0
+        self.switches = 0
+        self.waits = 0
+        self.wait_time = 0.0
+        self.max_wait = 0.0
+
+    @property
+    def open_count(self):
+        return len(self.idle) + len(self.in_use)
+
+    def acquire(self, database=None, timeout=None):
+        """A connection with ``database`` selected (or whatever it had when None).
+
+        Waits up to ``timeout`` seconds when all connections are in use and
+        raises PoolError when none becomes free.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        start = time.perf_counter()
+        with self.cond:
+            if self.closed:
+                raise PoolError(f"Connection pool for {self.user}@{self.host} is closed")
+            while not self.idle and self.open_count >= self.size:
+                remaining = timeout - (time.perf_counter() - start)
+                if remaining <= 0:
+                    raise PoolError(f"No free connection for {self.user}@{self.host} after {timeout}s "
+                                    f"({self.size} in use)")
+                self.cond.wait(remaining)
+            waited = time.perf_counter() - start
+            if waited > 0.001:
+                self.waits += 1
+                self.wait_time += waited
+                self.max_wait = max(self.max_wait, waited)
+            entry = self._take_idle(database)
+            # Reserve the slot before connecting so other threads respect the size
+            slot = object()
+            self.in_use[id(slot)] = None
+
+        try:
+            conn, current = self._prepare(entry, database)
+        except Exception:
+            with self.cond:
+                self.in_use.pop(id(slot), None)
+                self.cond.notify()
+            raise
+
+        with self.cond:
+            self.in_use.pop(id(slot), None)
+            self.in_use[id(conn)] = current
+        return conn
+
+    def _take_idle(self, database):
+        """Most recently used idle entry, preferring one already on ``database``"""
+        if not self.idle:
+            return (None, None, None)
+        for i in range(len(self.idle) - 1, -1, -1):
+            if database is None or self.idle[i][1] == database:
+                return self.idle.pop(i)
+        return self.idle.pop()
+
+    def _prepare(self, entry, database):
+        conn, current, released_at = entry
+        if conn is not None and time.time() - released_at >= self.ping_after:
+            try:
+                conn.ping(reconnect=False)
+            except Exception:
+                self._discard(conn)
+                conn = None
+                with self.cond:
+                    self.replaced += 1
+
+        if conn is None:
+            if database:
+                conn = connect_database(self.host, self.user, self.password, database)
+            else:
+                conn = connect_server(self.host, self.user, self.password)
+            self._init_session(conn)
+            with self.cond:
+                self.created += 1
+            return conn, database
+
+        with self.cond:
+            self.reused += 1
+        if database and database != current:
+            self._init_db(conn, database)
+            current = database
+        return conn, current
+
+    def _init_session(self, conn):
+        for sql in self.session_sql:
+            cursor = conn.cursor()
+            try:
+                cursor.execute(sql)
+            except Error:
+                pass  # a setting this server does not have (MariaDB, 5.7)
+            finally:
+                cursor.close()
+
+    def _init_db(self, conn, database):
+        conn.cmd_init_db(database)
+        with self.cond:
+            self.switches += 1
+
+    def switch(self, conn, database):
+        """Select another database on a connection that is checked out"""
+        with self.cond:
+            current = self.in_use.get(id(conn))
+        if current != database:
+            self._init_db(conn, database)
+            with self.cond:
+                self.in_use[id(conn)] = database
+
+    def database_of(self, conn):
+        """Database selected on a checked-out connection, as far as the pool knows"""
+        with self.cond:
+            return self.in_use.get(id(conn))
+
+    def release(self, conn):
+        """Return a connection; session state is reset so the next user starts clean"""
+        with self.cond:
+            database = self.in_use.pop(id(conn), None)
+        try:
+            # COM_RESET_CONNECTION: rolls back, drops temp tables and session
+            # variables, keeps the selected database and skips re-authentication
+            if self.closed:
+                raise PoolError("pool closed")
+            conn.reset_session()
+            self._init_session(conn)
+        except Exception:
+            self._discard(conn)
+            with self.cond:
+                self.cond.notify()
+            return
+        with self.cond:
+            self.idle.append((conn, database, time.time()))
+            self.cond.notify()
+
+    def kill_query(self, conn):
+        """Stop the statement running on conn with KILL QUERY; the connection stays open.
+
+        Sent over a control connection of its own, since every pooled one may
+        be busy. Returns False when the server could not be asked.
+        """
+        connection_id = getattr(conn, "connection_id", None)
+        if connection_id is None:
+            return False
+        with self.control_lock:
+            for _ in range(2):  # once more on a fresh connection if the old one went away
+                try:
+                    if self.control is None:
+                        self.control = connect_server(self.host, self.user, self.password)
+                    cursor = self.control.cursor()
+                    cursor.execute(f"KILL QUERY {int(connection_id)}")
+                    cursor.close()
+                except Error as e:
+                    if e.errno == ER_NO_SUCH_THREAD:
+                        return False  # that connection is gone already
+                    if self.control is not None:
+                        self._discard(self.control)
+                        self.control = None
+                    continue
+                with self.cond:
+                    self.kills += 1
+                return True
+        return False
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def close(self):
+        """Close the idle connections; checked-out ones close when released"""
+        with self.cond:
+            idle, self.idle = self.idle, []
+            self.closed = True
+        for conn, _, _ in idle:
+            self._discard(conn)
+        with self.control_lock:
+            if self.control is not None:
+                self._discard(self.control)
+                self.control = None
+
+    def stats(self):
+        with self.cond:
+            return {
+                "size": self.size,
+                "open": self.open_count,
+                "in_use": len(self.in_use),
+                "idle": len(self.idle),
+                "created": self.created,
+                "reused": self.reused,
+                "replaced": self.replaced,
+                "switches": self.switches,
+                "kills": self.kills,
+                "waits": self.waits,
+                "avg_wait": self.wait_time / self.waits if self.waits else 0.0,
+                "max_wait": self.max_wait,
+            }
+
+    def summary(self):
+        s = self.stats()
+        return (f"{self.user}@{self.host}: {s['open']}/{s['size']} open ({s['in_use']} in use, {s['idle']} idle), "
+                f"{s['created']} created, {s['reused']} reused, {s['replaced']} replaced, "
+                f"{s['switches']} database switch(es), {s['kills']} query kill(s), {s['waits']} wait(s) "
+                f"avg {s['avg_wait'] * 1000:.0f}ms max {s['max_wait'] * 1000:.0f}ms")
+
+
+def get_pool(host, user, password, config=None):
+    """The process-wide pool for a profile, created on first use"""
+    config = config or {}
+    with _pools_lock:
+        pool = _pools.get((host, user))
+        if pool is not None and pool.password != password:
+            pool.close()
+            pool = None
+        if pool is None:
+            pool = ConnectionPool(
+                host, user, password,
+                size=config.get("db_pool_size", DEFAULT_POOL_SIZE),
+                timeout=config.get("db_pool_timeout", DEFAULT_POOL_TIMEOUT),
+                ping_after=config.get("db_pool_ping_after", DEFAULT_PING_AFTER),
+                session_sql=[STATS_EXPIRY_SQL] if config.get("result_cache", False) else []
+            )
+            _pools[(host, user)] = pool
+        return pool
+
+
+def close_pools():
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
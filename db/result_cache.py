@@ -0,0 +1,240 @@
+import hashlib
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+from mysql.connector import Error
+
+from utils.sql_lexer import code_tokens, is_read_only, uses_session_state, table_references
+
+DEFAULT_RESULT_CACHE_BYTES = 32 * 1024 * 1024
+DEFAULT_RESULT_CACHE_TTL = 300  # seconds; the only check for tables whose engine keeps no UPDATE_TIME
+ENTRY_SHARE = 4     # one result may use up to 1/4 of the budget
+# Run once per pooled connection (see db.pool): MySQL 8 otherwise serves
+# UPDATE_TIME from a statistics cache that is refreshed once a day
+STATS_EXPIRY_SQL = "SET SESSION information_schema_stats_expiry = 0"
+# Functions whose value changes between two runs of the same statement
+_VOLATILE_WORDS = {
+    "NOW", "SYSDATE", "CURDATE", "CURTIME", "CURRENT_DATE", "CURRENT_TIME", "CURRENT_TIMESTAMP",
+    "LOCALTIME", "LOCALTIMESTAMP", "UNIX_TIMESTAMP", "UTC_DATE", "UTC_TIME", "UTC_TIMESTAMP",
+    "RAND", "UUID", "UUID_SHORT", "USER", "CURRENT_USER", "SESSION_USER", "SYSTEM_USER",
+    "DATABASE", "SCHEMA", "SLEEP", "BENCHMARK", "GET_LOCK", "IS_FREE_LOCK", "IS_USED_LOCK",
+}
+# Statements that change table contents or definitions
+_WRITE_STATEMENTS = {"INSERT", "UPDATE", "DELETE", "REPLACE", "LOAD", "TRUNCATE", "ALTER", "DROP", "RENAME", "CREATE"}
+# Their tables have no meaningful UPDATE_TIME, so results could never be trusted
+_SYSTEM_SCHEMAS = {"information_schema", "performance_schema", "mysql", "sys"}
+
+
+def normalize_sql(sql):
+    """Statement text without comments, extra whitespace or a trailing ';'"""
+    tokens = code_tokens(sql)
+    while tokens and tokens[-1].text == ";":
+        tokens.pop()
+    return " ".join(t.text for t in tokens)
+
+
+def cacheable_tables(sql):
+    """``[(database or None, table)]`` a cacheable SELECT reads, or None.
+
+    Only plain reads of base tables qualify: no writes or locks, no session
+    state and no functions such as NOW() or RAND() that differ per run.
+    """
+    tokens = code_tokens(sql)
+    words = [t.upper for t in tokens if t.kind == "word"]
+    if not words or words[0] not in ("SELECT", "WITH") or not is_read_only(sql) or uses_session_state(sql):
+        return None
+    if any(word in _VOLATILE_WORDS for word in words):
+        return None
+    tables = set()
+    for table in table_references(sql, qualified=True).values():
+        database, _, name = table.rpartition(".")
+        if database.lower() in _SYSTEM_SCHEMAS:
+            return None
+        tables.add((database or None, name))
+    return sorted(tables, key=lambda t: (t[0] or "", t[1])) or None
+
+
+def rows_bytes(rows):
+    """Rough in-memory size of some rows, for the byte budget"""
+    return sum(sys.getsizeof(row) + sum(sys.getsizeof(value) for value in row) for row in rows)
+
+
+def _result_bytes(rows, description):
+    return sys.getsizeof(rows) + sum(sys.getsizeof(d[0]) for d in description) + rows_bytes(rows)
+
+
+class _CachedCursor:
+    """Stands in for an unbuffered cursor so cached rows page like live ones"""
+
+    with_rows = True
+
+    def __init__(self, entry):
+        self.description = entry.description
+        self.rowcount = 0
+        self._rows = entry.rows
+        self._warnings = entry.warnings
+
+    def fetchmany(self, size):
+        batch = self._rows[self.rowcount:self.rowcount + size]
+        self.rowcount += len(batch)
+        return batch
+
+    def fetchwarnings(self):
+        return list(self._warnings)
+
+    def close(self):
+        pass
+
+
+class CachedResult:
+    """Rows of one complete result and the table versions they were read at"""
+
+    def __init__(self, description, rows, warnings, versions, size):
+        self.description = description
+        self.rows = rows
+        self.warnings = warnings
+        self.versions = versions
+        self.size = size
+        self.created = time.time()
+
+    def cursor(self):
+        return _CachedCursor(self)
+
+
+class ResultCache:
+    """In-memory LRU of SELECT results, bounded by total bytes.
+
+    Entries are keyed on normalized SQL plus the current database. An entry
+    is used only while every table it read still has the same UPDATE_TIME
+    and CHECKSUM in information_schema.TABLES, and never after the TTL.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_RESULT_CACHE_BYTES, ttl=DEFAULT_RESULT_CACHE_TTL):
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_bytes // ENTRY_SHARE
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.lock = threading.Lock()
+
+    def versions(self, conn, tables):
+        """``(database, {(db, table): (update_time, checksum)})`` or None if untrackable.
+
+        Views, temporary tables and CTE names have no row of their own in
+        information_schema.TABLES, so statements that read them are not cached.
+        """
+        cursor = conn.cursor()
+        try:
+            pairs = ", ".join(["(COALESCE(%s, DATABASE()), %s)"] * len(tables))
+            cursor.execute(
+                "SELECT DATABASE(), TABLE_SCHEMA, TABLE_NAME, TABLE_TYPE, UPDATE_TIME, CHECKSUM "
+                f"FROM information_schema.TABLES WHERE (TABLE_SCHEMA, TABLE_NAME) IN ({pairs})",
+                [value for table in tables for value in table]
+            )
+            rows = cursor.fetchall()
+        except Error:
+            return None
+        finally:
+            cursor.close()
+
+        if not rows:
+            return None
+        database = rows[0][0]
+        found = {}
+        for _, schema, name, table_type, updated, checksum in rows:
+            if table_type != "BASE TABLE":
+                return None
+            found[(schema.lower(), name.lower())] = (str(updated), checksum)
+        versions = {}
+        for schema, name in tables:
+            key = ((schema or database or "").lower(), name.lower())
+            if key not in found:
+                return None
+            versions[key] = found[key]
+        return database, versions
+
+    @staticmethod
+    def key(database, sql):
+        return hashlib.sha256(f"{database}\0{normalize_sql(sql)}".encode("utf-8")).hexdigest()
+
+    def get(self, key, versions):
+        """Live entry for key at these table versions, or None"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry.versions != versions or time.time() - entry.created >= self.ttl:
+                self._drop(key)
+                self.stale += 1
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, description, rows, warnings, versions):
+        size = _result_bytes(rows, description)
+        if size > self.max_entry_bytes:
+            return
+        with self.lock:
+            if key in self.entries:
+                self._drop(key)
+            self.entries[key] = CachedResult(description, list(rows), list(warnings), versions, size)
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                self._drop(next(iter(self.entries)))
+
+    def invalidate(self, tables=None):
+        """Drop entries that read any of these table names (all entries without names)"""
+        names = {name.lower() for name in tables} if tables else None
+        with self.lock:
+            for key in list(self.entries):
+                if names is None or names & {name for _, name in self.entries[key].versions}:
+                    self._drop(key)
+
+    def invalidate_for(self, sql):
+        """Drop what a write just made stale.
+
+        UPDATE_TIME would catch it as well, but only once the server has
+        updated it. DDL such as TRUNCATE or DROP names its table where
+        table_references() does not look, so it clears everything.
+        """
+        words = [t.upper for t in code_tokens(sql) if t.kind == "word"]
+        if words and words[0] in _WRITE_STATEMENTS:
+            self.invalidate(set(table_references(sql).values()))
+
+    def _drop(self, key):
+        entry = self.entries.pop(key)
+        self.bytes -= entry.size
+
+    def clear(self):
+        self.invalidate()
+
+    def stats(self):
+        total = self.hits + self.misses
+        rate = 100 * self.hits / total if total else 0
+        return (f"{self.hits} hits, {self.misses} misses ({self.stale} stale), {rate:.0f}% hit rate, "
+                f"{len(self.entries)} results in {self.bytes / 1024 / 1024:.1f} of "
+                f"{self.max_bytes / 1024 / 1024:.0f} MiB")
+
+
+_cache = None
+
+
+def get_result_cache(config):
+    """Shared result cache for the process, or None unless result_cache is on"""
+    global _cache
+    if not config.get("result_cache", False):
+        return None
+    if _cache is None:
+        _cache = ResultCache(
+            max_bytes=config.get("result_cache_bytes", DEFAULT_RESULT_CACHE_BYTES),
+            ttl=config.get("result_cache_ttl", DEFAULT_RESULT_CACHE_TTL)
+        )
+    return _cache
@@ -1,3 +1,6 @@
+import time
+
+
 def list_databases(conn):
     cur = conn.cursor()
     cur.execute("SHOW DATABASES")
@@ -12,20 +15,137 @@ def table_schema(conn, table):
     cur.close()
     return schema
 
-def get_database_schema(conn):
-    """Get all tables and their columns for the current database"""
+
+class DatabaseSchema:
+    """Tables of one database with their columns, keys and indexes.
+
+    ``tables`` maps a table name to a plain dict (so it can be written to
+    JSON as-is)::
+
+        {"comment": str,
+         "columns": [[name, type, comment], ...],
+         "primary_key": [column, ...],
+         "indexes": {index_name: {"columns": [...], "unique": bool}},
+         "foreign_keys": [{"columns": [...], "ref_table": str, "ref_columns": [...]}]}
+
+    Iterating yields ``(table, column, type)`` tuples, the shape the rest of
+    SnapBase has always consumed.
+    """
+
+    def __init__(self, database, tables=None):
+        self.database = database
+        self.tables = tables if tables is not None else {}
+        self.load_time = 0.0
+        self.query_count = 0
+        self.cache_status = None
+
+    def __iter__(self):
+        for table, info in self.tables.items():
+            for name, col_type, _ in info["columns"]:
+                yield (table, name, col_type)
+
+    def __len__(self):
+        return self.column_count
+
+    def __bool__(self):
+        return bool(self.tables)
+
+    @property
+    def column_count(self):
+        return sum(len(info["columns"]) for info in self.tables.values())
+
+    def summary(self):
+        text = (f"{len(self.tables)} tables, {self.column_count} columns "
+                f"in {self.load_time:.2f}s ({self.query_count} queries)")
+        if self.cache_status:
+            text += f", cache {self.cache_status}"
+        return text
+
+
+def _new_table():
+    return {"comment": "", "columns": [], "primary_key": [], "indexes": {}, "foreign_keys": []}
+
+
+def _table_filter(tables, column="TABLE_NAME"):
+    if tables is None:
+        return "", ()
+    return f" AND {column} IN ({', '.join(['%s'] * len(tables))})", tuple(tables)
+
+
+def load_tables(conn, database, tables=None):
+    """Introspect columns, keys and indexes with a fixed number of set-based queries.
+
+    Returns ``(tables_dict, query_count)``. ``tables`` limits the work to the
+    named tables; by default the whole database is read.
+    """
+    result = {}
+    if tables is not None and not tables:
+        return result, 0
+
+    where, names = _table_filter(tables)
+    params = (database,) + names
+    column_where, _ = _table_filter(tables, "c.TABLE_NAME")
     cur = conn.cursor()
-    cur.execute("SHOW TABLES")
-    tables = [x[0] for x in cur.fetchall()]
-    
-    schema = []
-    for table in tables:
-        cur.execute(f"DESCRIBE {table}")
-        columns = cur.fetchall()
-        for col in columns:
-            col_name = col[0]
-            col_type = col[1]
-            schema.append((table, col_name, col_type))
-    
+
+    cur.execute(
+        "SELECT c.TABLE_NAME, c.COLUMN_NAME, c.COLUMN_TYPE, c.COLUMN_COMMENT, t.TABLE_COMMENT "
+        "FROM information_schema.COLUMNS c "
+        "JOIN information_schema.TABLES t "
+        "ON t.TABLE_SCHEMA = c.TABLE_SCHEMA AND t.TABLE_NAME = c.TABLE_NAME "
+        "WHERE c.TABLE_SCHEMA = %s" + column_where + " "
+        "ORDER BY c.TABLE_NAME, c.ORDINAL_POSITION",
+        params
+    )
+    for table, column, col_type, comment, table_comment in cur.fetchall():
+        info = result.setdefault(table, _new_table())
+        info["comment"] = table_comment or ""
+        info["columns"].append([column, col_type, comment or ""])
+
+    cur.execute(
+        "SELECT TABLE_NAME, INDEX_NAME, NON_UNIQUE, COLUMN_NAME "
+        "FROM information_schema.STATISTICS "
+        "WHERE TABLE_SCHEMA = %s" + where + " "
+        "ORDER BY TABLE_NAME, INDEX_NAME, SEQ_IN_INDEX",
+        params
+    )
+    for table, index, non_unique, column in cur.fetchall():
+        info = result.get(table)
+        if info is None:
+            continue
+        if index == "PRIMARY":
+            info["primary_key"].append(column)
+        else:
+            entry = info["indexes"].setdefault(index, {"columns": [], "unique": not int(non_unique)})
+            entry["columns"].append(column)
+
+    cur.execute(
+        "SELECT TABLE_NAME, CONSTRAINT_NAME, COLUMN_NAME, REFERENCED_TABLE_NAME, REFERENCED_COLUMN_NAME "
+        "FROM information_schema.KEY_COLUMN_USAGE "
+        "WHERE TABLE_SCHEMA = %s" + where + " AND REFERENCED_TABLE_NAME IS NOT NULL "
+        "ORDER BY TABLE_NAME, CONSTRAINT_NAME, ORDINAL_POSITION",
+        params
+    )
+    constraints = {}
+    for table, constraint, column, ref_table, ref_column in cur.fetchall():
+        info = result.get(table)
+        if info is None:
+            continue
+        fk = constraints.get((table, constraint))
+        if fk is None:
+            fk = {"columns": [], "ref_table": ref_table, "ref_columns": []}
+            constraints[(table, constraint)] = fk
+            info["foreign_keys"].append(fk)
+        fk["columns"].append(column)
+        fk["ref_columns"].append(ref_column)
+
     cur.close()
-    return schema
\ No newline at end of file
+    return result, 3
+
+
+def get_database_schema(conn):
+    """Get all tables with columns, keys and indexes for the current database"""
+    start = time.perf_counter()
+    schema = DatabaseSchema(conn.database)
+    schema.tables, schema.query_count = load_tables(conn, conn.database)
+    schema.load_time = time.perf_counter() - start
+    return schema
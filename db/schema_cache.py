@@ -0,0 +1,111 @@
+import hashlib
+import json
+import os
+import time
+
+from config.store import CACHE_DIR
+from db.schema import DatabaseSchema, load_tables
+
+SCHEMA_CACHE_DIR = os.path.join(CACHE_DIR, "schema")
+CACHE_VERSION = 2
+
+
+def _cache_path(host, user, database):
+    key = hashlib.sha256(f"{host}\0{user}\0{database}".encode("utf-8")).hexdigest()[:32]
+    return os.path.join(SCHEMA_CACHE_DIR, f"{key}.json")
+
+
+def table_stamps(conn, database):
+    """Cheap per-table fingerprint: one row per table, from a single query.
+
+    CREATE_TIME moves on CREATE/ALTER/rebuild, but instant and in-place
+    ALTERs (ADD COLUMN ... ALGORITHM=INSTANT, ADD INDEX, foreign keys,
+    comments) leave it alone, so a checksum over what load_tables() reads
+    from COLUMNS, STATISTICS and KEY_COLUMN_USAGE is part of the stamp.
+    UPDATE_TIME is deliberately left out because it moves on every write
+    and says nothing about the schema.
+    """
+    # BIT_XOR(CRC32(...)) rather than GROUP_CONCAT, which group_concat_max_len would cut short
+    cur = conn.cursor()
+    cur.execute(
+        "SELECT t.TABLE_NAME, t.CREATE_TIME, t.TABLE_COMMENT, c.sig, s.sig, k.sig "
+        "FROM information_schema.TABLES t "
+        "LEFT JOIN (SELECT TABLE_NAME, CONCAT(COUNT(*), ':', BIT_XOR(CRC32(CONCAT_WS('|', "
+        "COLUMN_NAME, COLUMN_TYPE, COLUMN_COMMENT, ORDINAL_POSITION)))) AS sig "
+        "FROM information_schema.COLUMNS WHERE TABLE_SCHEMA = %s GROUP BY TABLE_NAME) c "
+        "ON c.TABLE_NAME = t.TABLE_NAME "
+        "LEFT JOIN (SELECT TABLE_NAME, CONCAT(COUNT(*), ':', BIT_XOR(CRC32(CONCAT_WS('|', "
+        "INDEX_NAME, NON_UNIQUE, COLUMN_NAME, SEQ_IN_INDEX)))) AS sig "
+        "FROM information_schema.STATISTICS WHERE TABLE_SCHEMA = %s GROUP BY TABLE_NAME) s "
+        "ON s.TABLE_NAME = t.TABLE_NAME "
+        "LEFT JOIN (SELECT TABLE_NAME, CONCAT(COUNT(*), ':', BIT_XOR(CRC32(CONCAT_WS('|', "
+        "CONSTRAINT_NAME, COLUMN_NAME, REFERENCED_TABLE_NAME, REFERENCED_COLUMN_NAME)))) AS sig "
+        "FROM information_schema.KEY_COLUMN_USAGE WHERE TABLE_SCHEMA = %s GROUP BY TABLE_NAME) k "
+        "ON k.TABLE_NAME = t.TABLE_NAME "
+        "WHERE t.TABLE_SCHEMA = %s",
+        (database, database, database, database)
+    )
+    stamps = {table: "|".join(str(part) for part in parts) for table, *parts in cur.fetchall()}
+    cur.close()
+    return stamps
+
+
+def _read_cache(path):
+    try:
+        with open(path, "r") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if data.get("version") != CACHE_VERSION:
+        return None
+    return data
+
+
+def _write_cache(path, stamps, tables):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump({"version": CACHE_VERSION, "stamps": stamps, "tables": tables}, f)
+    os.replace(tmp, path)
+
+
+def get_cached_schema(conn, host, user, refresh=False):
+    """Load the schema of the current database through the on-disk cache.
+
+    Only tables whose fingerprint changed since the cached copy was written
+    are introspected again; dropped tables are removed. ``refresh`` ignores
+    the cache and rebuilds it from scratch.
+    """
+    start = time.perf_counter()
+    database = conn.database
+    path = _cache_path(host, user, database)
+    stamps = table_stamps(conn, database)
+
+    cached = None if refresh else _read_cache(path)
+    if cached is None:
+        tables, query_count = load_tables(conn, database)
+        status = "rebuilt" if refresh else "miss"
+    else:
+        old_stamps = cached["stamps"]
+        changed = [t for t, stamp in stamps.items() if old_stamps.get(t) != stamp]
+        tables = {t: info for t, info in cached["tables"].items() if t in stamps and t not in changed}
+        loaded, query_count = load_tables(conn, database, changed)
+        tables.update(loaded)
+        dropped = len(old_stamps.keys() - stamps.keys())
+        if changed or dropped:
+            status = f"hit, {len(changed)} changed / {dropped} dropped table(s) refreshed"
+        else:
+            status = "hit"
+
+    tables = dict(sorted(tables.items()))
+    if cached is None or status != "hit":
+        try:
+            _write_cache(path, stamps, tables)
+        except OSError as e:
+            print(f"⚠️ Could not write schema cache: {e}")
+
+    schema = DatabaseSchema(database, tables)
+    schema.query_count = query_count + 1
+    schema.cache_status = status
+    schema.load_time = time.perf_counter() - start
+    return schema
@@ -0,0 +1,98 @@
+import threading
+
+KILL_GRACE = 1.0   # extra seconds before stepping in for a statement the server limits itself
+POLL_INTERVAL = 0.1  # untimed lock waits can't be interrupted by Ctrl-C on Windows
+ER_QUERY_INTERRUPTED = 1317
+ER_QUERY_TIMEOUT = 3024     # MAX_EXECUTION_TIME exceeded
+
+
+class Watchdog:
+    """Stops the statement running on conn with KILL QUERY over the pool's side connection.
+
+    As a context manager it stops the statement once ``timeout`` seconds
+    have passed; run() also turns Ctrl-C into a KILL QUERY, so the session
+    survives a cancelled statement.
+    """
+
+    def __init__(self, conn, pool, timeout=None):
+        self.conn = conn
+        self.pool = pool
+        self.timeout = timeout
+        self.reason = None      # "timeout" or "cancelled" once stop() was called
+        self._timer = None
+        self._finished = False
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        if self.timeout:
+            self._timer = threading.Timer(self.timeout, self.stop, ("timeout",))
+            self._timer.daemon = True
+            self._timer.start()
+        return self
+
+    def __exit__(self, *exc):
+        if self._timer is not None:
+            self._timer.cancel()
+        # cancel() can't stop a timer that already fired: wait for its KILL
+        # to go out, and keep later ones off the connection's next statement
+        with self._lock:
+            self._finished = True
+        return False
+
+    def stop(self, reason):
+        """KILL QUERY the running statement; False when that could not be sent"""
+        with self._lock:
+            if self._finished:
+                return False
+            self.reason = self.reason or reason
+            if self.pool is None:
+                return False
+            return self.pool.kill_query(self.conn)
+
+    def run(self, action):
+        """Return action() run on a worker thread while this one waits for Ctrl-C.
+
+        Only the worker reads from the connection, so an interrupt never
+        leaves it halfway through a reply: Ctrl-C sends KILL QUERY, the
+        worker gets the server's error and returns normally. A second Ctrl-C
+        while the statement is still running gives up on it.
+        """
+        done = threading.Event()
+        outcome = {}
+
+        def work():
+            try:
+                outcome["value"] = action()
+            except BaseException as e:
+                outcome["error"] = e
+            finally:
+                done.set()
+
+        threading.Thread(target=work, daemon=True).start()
+        interrupted = False
+        with self:
+            while not done.is_set():
+                try:
+                    done.wait(POLL_INTERVAL)
+                except KeyboardInterrupt:
+                    if interrupted:
+                        raise
+                    if done.is_set():
+                        break
+                    interrupted = True
+                    print("\n↪ Cancelling the running statement…")
+                    if not self.stop("cancelled"):
+                        print("⚠️ Could not send KILL QUERY; waiting for the statement to finish "
+                              "(Ctrl-C again to quit)")
+        if "error" in outcome:
+            raise outcome["error"]
+        return outcome["value"]
+
+
+def stopped_message(errno, reason, timeout=None):
+    """Friendlier text for a statement stopped by a time limit or Ctrl-C, or None"""
+    if errno == ER_QUERY_TIMEOUT or (reason == "timeout" and errno == ER_QUERY_INTERRUPTED):
+        return f"⏱ Statement stopped after {timeout:g}s (query_timeout)" if timeout else "⏱ Statement timed out"
+    if reason == "cancelled" and errno == ER_QUERY_INTERRUPTED:
+        return "↪ Statement cancelled; the connection is still usable"
+    return None
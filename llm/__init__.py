@@ -1,13 +1,26 @@
-from .generator import (
-    generate_sql,
-    test_api_key,
-    test_ollama_connection,
-    generate_sql_with_ollama
-)
+import importlib
+
+# Resolved on first access so that importing a submodule (or the package
+# itself) does not pull in requests and every provider module.
+_EXPORTS = {
+    "generate_sql": ".generator",
+    "test_api_key": ".generator",
+    "test_ollama_connection": ".generator",
+    "generate_sql_with_ollama": ".generator",
+}
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
+
 
 __all__ = [
     "generate_sql",
     "test_api_key",
     "test_ollama_connection",
     "generate_sql_with_ollama"
-]
\ No newline at end of file
+]
@@ -0,0 +1,142 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from config.store import CACHE_DIR
+
+RESPONSE_CACHE_FILE = os.path.join(CACHE_DIR, "llm_cache.sqlite3")
+DEFAULT_CACHE_SIZE = 256
+DEFAULT_CACHE_TTL = 7 * 24 * 3600  # seconds
+
+
+def normalize_question(question):
+    """Lowercase, collapse whitespace and drop trailing punctuation"""
+    text = re.sub(r"\s+", " ", question.strip().lower())
+    return text.rstrip(" ?.!;")
+
+
+def fingerprint(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def cache_key(question, provider, model, schema_text, kind="response"):
+    """Key for one NL→SQL answer; a schema change gives a new key"""
+    parts = [kind, normalize_question(question), provider, model, fingerprint(schema_text)]
+    return fingerprint(json.dumps(parts))
+
+
+class ResponseCache:
+    """Two-tier NL→SQL cache: in-memory LRU in front of a SQLite store with TTL"""
+
+    def __init__(self, path=RESPONSE_CACHE_FILE, capacity=DEFAULT_CACHE_SIZE, ttl=DEFAULT_CACHE_TTL):
+        self.capacity = capacity
+        self.ttl = ttl
+        self.memory = OrderedDict()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.template_hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, sql TEXT NOT NULL, created REAL NOT NULL)"
+        )
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS templates ("
+            "key TEXT PRIMARY KEY, template TEXT NOT NULL, created REAL NOT NULL)"
+        )
+        for table in ("responses", "templates"):
+            self.db.execute(f"DELETE FROM {table} WHERE created < ?", (time.time() - ttl,))
+        self.db.commit()
+
+    def _remember(self, key, sql, created):
+        self.memory[key] = (sql, created)
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.capacity:
+            self.memory.popitem(last=False)
+
+    def get(self, key):
+        """Return (sql, tier) for a live entry, or (None, None)"""
+        now = time.time()
+        with self.lock:
+            entry = self.memory.get(key)
+            if entry is not None and now - entry[1] < self.ttl:
+                self.memory.move_to_end(key)
+                self.memory_hits += 1
+                return entry[0], "memory"
+
+            row = self.db.execute("SELECT sql, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is not None and now - row[1] < self.ttl:
+                self._remember(key, row[0], row[1])
+                self.disk_hits += 1
+                return row[0], "disk"
+
+            self.memory.pop(key, None)
+            self.misses += 1
+            return None, None
+
+    def put(self, key, sql):
+        now = time.time()
+        with self.lock:
+            self._remember(key, sql, now)
+            self.db.execute("INSERT OR REPLACE INTO responses (key, sql, created) VALUES (?, ?, ?)", (key, sql, now))
+            self.db.commit()
+
+    def get_template(self, key):
+        """Stored SQL template for a question shape, or None"""
+        with self.lock:
+            row = self.db.execute("SELECT template, created FROM templates WHERE key = ?", (key,)).fetchone()
+        if row is None or time.time() - row[1] >= self.ttl:
+            return None
+        return json.loads(row[0])
+
+    def record_template_hit(self):
+        """Count a response miss that a template answered after all"""
+        with self.lock:
+            self.misses -= 1
+            self.template_hits += 1
+
+    def put_template(self, key, template):
+        with self.lock:
+            self.db.execute(
+                "INSERT OR REPLACE INTO templates (key, template, created) VALUES (?, ?, ?)",
+                (key, json.dumps(template), time.time())
+            )
+            self.db.commit()
+
+    def clear(self):
+        with self.lock:
+            self.memory.clear()
+            self.db.execute("DELETE FROM responses")
+            self.db.execute("DELETE FROM templates")
+            self.db.commit()
+
+    def stats(self):
+        hits = self.memory_hits + self.disk_hits + self.template_hits
+        total = hits + self.misses
+        rate = 100 * hits / total if total else 0
+        return (f"{hits} hits ({self.memory_hits} memory, {self.disk_hits} disk, {self.template_hits} template), "
+                f"{self.misses} misses, {rate:.0f}% hit rate, {len(self.memory)} in memory")
+
+
+_cache = None
+
+
+def get_response_cache(config):
+    """Shared cache for the whole process, or None when disabled in config"""
+    global _cache
+    if not config.get("llm_cache", True):
+        return None
+    if _cache is None:
+        _cache = ResponseCache(
+            capacity=config.get("llm_cache_size", DEFAULT_CACHE_SIZE),
+            ttl=config.get("llm_cache_ttl", DEFAULT_CACHE_TTL)
+        )
+    return _cache
@@ -0,0 +1,154 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from db.explain import explain, EXPLAINABLE
+from utils.sql_cleaner import extract_sql
+from utils.sql_lexer import code_tokens, split_statements, table_references
+
+DEFAULT_CANDIDATE_TEMPERATURE = 0.7   # later samples need some spread to differ
+
+
+class Candidate:
+    """One generated answer with its validation problems and estimated cost"""
+
+    def __init__(self, number, sql):
+        self.number = number
+        self.sql = sql
+        self.problems = []
+        self.cost = 0.0
+        self.rows_examined = 0
+        self.flags = []
+
+    @property
+    def valid(self):
+        return not self.problems
+
+    def sort_key(self):
+        return (not self.valid, self.cost, self.number)
+
+
+def _cte_names(tokens):
+    """Names defined by WITH name AS (...), which are not schema tables"""
+    names = set()
+    for i in range(len(tokens) - 2):
+        if tokens[i + 1].upper == "AS" and tokens[i + 2].text == "(" and tokens[i].kind in ("word", "quoted_ident"):
+            names.add(tokens[i].value.lower())
+    return names
+
+
+def validate_sql(sql, schema):
+    """Problems found by checking sql against the loaded schema, without the server.
+
+    Tables after FROM/JOIN/UPDATE/INTO must exist, and ``alias.column``
+    references must name a column of that table. Unqualified names are
+    left to EXPLAIN, since telling them from aliases and functions needs a
+    full parser.
+    """
+    tables = {name.lower(): info for name, info in getattr(schema, "tables", {}).items()}
+    if not tables:
+        return []
+    problems = []
+    for statement in split_statements(sql):
+        tokens = code_tokens(statement)
+        virtual = _cte_names(tokens)
+        refs = {}
+        for alias, table in table_references(statement, qualified=True).items():
+            database, _, name = table.rpartition(".")
+            if database and database.lower() != str(schema.database).lower():
+                continue  # another schema (information_schema, ...) is not loaded
+            refs[alias] = name
+            if alias == table and name.lower() not in tables and name.lower() not in virtual:
+                problems.append(f"unknown table {name}")
+
+        for i in range(len(tokens) - 2):
+            first, dot, column = tokens[i], tokens[i + 1], tokens[i + 2]
+            if dot.text != "." or column.kind not in ("word", "quoted_ident"):
+                continue
+            if first.kind not in ("word", "quoted_ident") or (i + 3 < len(tokens) and tokens[i + 3].text == "."):
+                continue
+            table = refs.get(first.value, first.value).lower()
+            if table not in tables:
+                continue
+            names = {c[0].lower() for c in tables[table]["columns"]}
+            if column.value.lower() not in names and column.text != "*":
+                problems.append(f"unknown column {first.value}.{column.value}")
+    return sorted(set(problems))
+
+
+def generate_candidates(provider, prompt, count, temperature=DEFAULT_CANDIDATE_TEMPERATURE):
+    """Ask one provider for ``count`` answers with parallel requests.
+
+    The first request keeps the provider's usual temperature; the others
+    use a higher one so they explore different queries. The batch counts
+    as one outcome for the circuit breaker: a success if any request
+    answered, so one error burst does not open it by itself. Returns the
+    distinct SQL statements in request order.
+    """
+    def ask(i):
+        return provider.attempt(prompt, temperature=None if i == 0 else temperature)
+
+    with ThreadPoolExecutor(max_workers=count) as executor:
+        attempts = list(executor.map(ask, range(count)))
+
+    outcomes = {outcome for _, outcome in attempts}
+    if "ok" in outcomes:
+        provider.record("ok")
+    else:
+        provider.record("unreachable" if outcomes == {"unreachable"} else "failed")
+    outputs = [output for output, _ in attempts]
+
+    seen = set()
+    candidates = []
+    for output in outputs:
+        sql = extract_sql(output)
+        key = " ".join(sql.lower().rstrip(";").split()) if sql else None
+        if sql and key not in seen:
+            seen.add(key)
+            candidates.append(Candidate(len(candidates) + 1, sql))
+    return candidates
+
+
+def _score(candidate, conn):
+    for statement in split_statements(candidate.sql):
+        words = [t.upper for t in code_tokens(statement) if t.kind == "word"]
+        if not words or words[0] not in EXPLAINABLE:
+            continue
+        plan = explain(conn, statement)
+        if plan is None:
+            candidate.problems.append("EXPLAIN failed")
+            return
+        candidate.cost += plan.cost
+        candidate.rows_examined += plan.rows_examined
+        candidate.flags += plan.flags()
+
+
+def rank_candidates(candidates, schema, conn, pool=None):
+    """Validate every candidate, EXPLAIN the valid ones and sort best first.
+
+    With a pool the EXPLAINs run concurrently, one pooled connection each;
+    otherwise they run one after another on conn.
+    """
+    for candidate in candidates:
+        candidate.problems = validate_sql(candidate.sql, schema)
+    valid = [c for c in candidates if c.valid]
+
+    if pool is None or len(valid) < 2:
+        for candidate in valid:
+            _score(candidate, conn)
+    else:
+        database = pool.database_of(conn)
+
+        def score_pooled(candidate):
+            try:
+                worker_conn = pool.acquire(database)
+            except Exception as e:
+                candidate.problems.append(f"no connection ({e})")
+                return
+            try:
+                _score(candidate, worker_conn)
+            finally:
+                pool.release(worker_conn)
+
+        with ThreadPoolExecutor(max_workers=min(len(valid), max(pool.size - 1, 1))) as executor:
+            list(executor.map(score_pooled, valid))
+
+    return sorted(candidates, key=Candidate.sort_key)
@@ -1,40 +1,107 @@
+import json
 import requests
 from typing import Optional
 
+from utils.sql_cleaner import collect_sql_stream
+from . import transport
+from .ollama_generator import DEFAULT_OLLAMA_MODEL, DEFAULT_KEEP_ALIVE, STATEMENT_STOP
+
 NVIDIA_URL = "https://integrate.api.nvidia.com/v1/chat/completions"
+NVIDIA_MODELS_URL = "https://integrate.api.nvidia.com/v1/models"
+NVIDIA_MODEL = "meta/llama-4-maverick-17b-128e-instruct"
+
+# Probes use their own session so they never skew generation latency stats
+HEALTH_CHANNEL = "nvidia:health"
+
+
+def check_nvidia(api_key):
+    """Cheap health check via the models list; no inference. Returns ``(ok, detail)``"""
+    headers = {"Authorization": f"Bearer {api_key}"}
+    r, _ = transport.get(HEALTH_CHANNEL, NVIDIA_MODELS_URL, headers=headers, read_timeout=5, retries=0)
+    if r.status_code in (401, 403):
+        return False, "API key rejected"
+    if r.status_code != 200:
+        return False, f"HTTP {r.status_code} from /v1/models"
+    models = {m.get("id") for m in r.json().get("data", [])}
+    if models and NVIDIA_MODEL not in models:
+        return False, f"model {NVIDIA_MODEL} is not offered"
+    return True, f"model {NVIDIA_MODEL} available"
+
 
-def test_api_key(api_key):
+def test_api_key(api_key, quiet=False):
+    """Validate a key with a tiny completion (used once, when a key is saved)"""
     try:
         headers = {"Authorization": f"Bearer {api_key}"}
         payload = {
-            "model": "meta/llama-4-maverick-17b-128e-instruct",
+            "model": NVIDIA_MODEL,
             "messages": [{"role": "user", "content": "Say OK"}],
             "max_tokens": 5
         }
-        r = requests.post(NVIDIA_URL, headers=headers, json=payload, timeout=10)
+        r, _ = transport.post(HEALTH_CHANNEL, NVIDIA_URL, headers=headers, json=payload, read_timeout=10, retries=0)
         return r.status_code == 200
     except Exception as e:
-        print(f"❌ API key validation error: {e}")
+        if not quiet:
+            print(f"❌ API key validation error: {e}")
         return False
 
-def generate_sql(prompt, api_key):
+def _sse_tokens(response, timing):
+    """Content deltas from an OpenAI-style server-sent event stream"""
+    for raw in transport.iter_lines(response, timing):
+        line = raw.decode("utf-8") if isinstance(raw, bytes) else raw
+        if not line.startswith("data:"):
+            continue
+        data = line[5:].strip()
+        if data == "[DONE]":
+            continue  # nothing follows; reading on to the end keeps the connection
+        choices = json.loads(data).get("choices") or [{}]
+        token = (choices[0].get("delta") or {}).get("content")
+        if token:
+            transport.mark_first_token(timing)
+            yield token
+        if choices[0].get("finish_reason") == "stop":
+            yield STATEMENT_STOP
+
+
+def generate_sql(prompt, api_key, stream=False, on_token=None, cancel=None, temperature=0.2):
+    """Generate SQL with NVIDIA.
+
+    With stream=True tokens are passed to on_token as they arrive and the
+    stream ends with the first complete statement: the server is asked to
+    stop at ';', and the rest is read or dropped once a statement is in.
+    Setting the ``cancel`` event drops it at once (the result is then None).
+    """
     try:
         headers = {
             "Authorization": f"Bearer {api_key}",
-            "Accept": "application/json"
+            "Accept": "text/event-stream" if stream else "application/json"
         }
 
         payload = {
-            "model": "meta/llama-4-maverick-17b-128e-instruct",
+            "model": NVIDIA_MODEL,
             "messages": [{"role": "user", "content": prompt}],
             "max_tokens": 512,
-            "temperature": 0.2
+            "temperature": temperature,
+            "stream": stream
         }
+        if stream:
+            payload["stop"] = [STATEMENT_STOP]
 
-        r = requests.post(NVIDIA_URL, headers=headers, json=payload, timeout=60)
-        r.raise_for_status()
-
-        content = r.json()["choices"][0]["message"]["content"].strip()
+        r, timing = transport.post("nvidia", NVIDIA_URL, headers=headers, json=payload, read_timeout=60, stream=stream)
+        if stream:
+            try:
+                r.raise_for_status()
+                tokens = _sse_tokens(r, timing)
+                content = collect_sql_stream(tokens, on_token, cancel).strip()
+                if cancel is None or not cancel.is_set():
+                    transport.drain(tokens)
+            finally:
+                r.close()
+                transport.finish(timing)
+            if cancel is not None and cancel.is_set():
+                return None
+        else:
+            r.raise_for_status()
+            content = r.json()["choices"][0]["message"]["content"].strip()
         return content if content else None
 
     except requests.exceptions.Timeout:
@@ -54,13 +121,14 @@ def generate_sql(prompt, api_key):
         return None
 
 
-def test_ollama_connection():
-    """Test if Ollama is running and accessible"""
+def test_ollama_connection(quiet=False, model: str = DEFAULT_OLLAMA_MODEL):
+    """Test if Ollama is running and the model is available"""
     from .ollama_generator import test_ollama_connection as ollama_test
-    return ollama_test()
+    return ollama_test(quiet, model)
 
 
-def generate_sql_with_ollama(prompt: str, model: str = "llama2") -> Optional[str]:
+def generate_sql_with_ollama(prompt: str, model: str = DEFAULT_OLLAMA_MODEL, stream: bool = False, on_token=None, cancel=None,
+                             keep_alive: str = DEFAULT_KEEP_ALIVE, temperature: float = 0.2) -> Optional[str]:
     """Generate SQL using Ollama"""
     from .ollama_generator import generate_sql_with_ollama as ollama_generate
-    return ollama_generate(prompt, model)
+    return ollama_generate(prompt, model, stream, on_token, cancel, keep_alive, temperature)
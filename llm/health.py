@@ -0,0 +1,65 @@
+import threading
+import time
+
+from .generator import check_nvidia, DEFAULT_OLLAMA_MODEL
+from .ollama_generator import check_ollama
+
+DEFAULT_HEALTH_TTL = 30  # seconds a probe result is trusted
+
+_results = {}       # provider -> (ok, detail, checked_at)
+_refreshing = set()
+_lock = threading.Lock()
+
+
+def check(provider, config):
+    """Run the cheap probe for a provider now and remember the result"""
+    try:
+        if provider == "ollama":
+            ok, detail = check_ollama(config.get("ollama_model", DEFAULT_OLLAMA_MODEL))
+        elif not config.get("api_key"):
+            ok, detail = False, "no API key configured"
+        else:
+            ok, detail = check_nvidia(config["api_key"])
+    except Exception as e:
+        ok, detail = False, f"unreachable ({e.__class__.__name__})"
+    with _lock:
+        _results[provider] = (ok, detail, time.time())
+    return ok, detail
+
+
+def refresh_in_background(provider, config):
+    """Start a probe on a daemon thread unless one is already running"""
+    with _lock:
+        if provider in _refreshing:
+            return
+        _refreshing.add(provider)
+
+    def run():
+        try:
+            check(provider, config)
+        finally:
+            with _lock:
+                _refreshing.discard(provider)
+
+    threading.Thread(target=run, daemon=True).start()
+
+
+def provider_health(provider, config):
+    """Cached ``(ok, detail)`` for a provider.
+
+    A fresh result is returned as-is; a stale healthy one is returned
+    immediately while a background probe refreshes it. Only a first call or
+    a stale failure waits, and then only for a cheap metadata request, so a
+    provider that has just come back is not reported down for a whole TTL.
+    """
+    ttl = config.get("health_ttl", DEFAULT_HEALTH_TTL)
+    with _lock:
+        entry = _results.get(provider)
+    if entry is None:
+        return check(provider, config)
+    ok, detail, checked_at = entry
+    if time.time() - checked_at >= ttl:
+        if not ok:
+            return check(provider, config)
+        refresh_in_background(provider, config)
+    return ok, detail
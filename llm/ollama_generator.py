@@ -1,47 +1,153 @@
+import json
 import requests
 from typing import Optional
 
+from utils.sql_cleaner import collect_sql_stream
+from . import transport
 
-OLLAMA_URL = "http://localhost:11434/api/generate"
 
-def test_ollama_connection():
-    """Test if Ollama is running and accessible"""
+OLLAMA_BASE_URL = "http://localhost:11434"
+OLLAMA_URL = f"{OLLAMA_BASE_URL}/api/generate"
+DEFAULT_OLLAMA_MODEL = "llama2"
+DEFAULT_KEEP_ALIVE = "30m"  # how long Ollama keeps the model loaded between questions
+# Streams end at the first statement, so the server stops generating there
+# itself; it leaves the stop sequence out, the token readers put it back
+STATEMENT_STOP = ";"
+
+# Probes use their own session so they never skew generation latency stats
+HEALTH_CHANNEL = "ollama:health"
+
+
+def check_ollama(model: str = DEFAULT_OLLAMA_MODEL):
+    """Cheap health check: is the server up and is the model pulled? No inference.
+
+    Returns ``(ok, detail)``.
+    """
+    r, _ = transport.get(HEALTH_CHANNEL, f"{OLLAMA_BASE_URL}/api/tags", read_timeout=5, retries=0)
+    if r.status_code != 200:
+        return False, f"HTTP {r.status_code} from /api/tags"
+    names = {m.get("name") for m in r.json().get("models", [])}
+    if model in names or f"{model}:latest" in names:
+        return True, f"model {model} available"
+
+    # Tags can miss aliases; /api/show resolves the name without loading the model
+    r, _ = transport.post(HEALTH_CHANNEL, f"{OLLAMA_BASE_URL}/api/show", json={"model": model}, read_timeout=5, retries=0)
+    if r.status_code == 200:
+        return True, f"model {model} available"
+    return False, f"model {model} is not pulled (run 'ollama pull {model}')"
+
+
+def test_ollama_connection(quiet=False, model: str = DEFAULT_OLLAMA_MODEL):
+    """Test if Ollama is running and the model is available"""
     try:
-        # Try to get a simple response from Ollama
-        payload = {
-            "model": "llama2",  # Default model for testing
-            "prompt": "Say OK",
-            "stream": False,
-            "options": {
-                "temperature": 0.1,
-                "num_predict": 10
-            }
-        }
-        r = requests.post(OLLAMA_URL, json=payload, timeout=10)
-        return r.status_code == 200
+        ok, detail = check_ollama(model)
+        if not ok and not quiet:
+            print(f"❌ Ollama: {detail}")
+        return ok
     except Exception as e:
-        print(f"❌ Ollama connection error: {e}")
+        if not quiet:
+            print(f"❌ Ollama connection error: {e}")
         return False
 
 
-def generate_sql_with_ollama(prompt: str, model: str = "llama2") -> Optional[str]:
-    """Generate SQL using Ollama"""
+def preload_ollama(model: str = DEFAULT_OLLAMA_MODEL, keep_alive: str = DEFAULT_KEEP_ALIVE) -> bool:
+    """Load the model into memory ahead of the first question.
+
+    A generate request without a prompt only loads the model and sets how
+    long it stays resident; no tokens are evaluated.
+    """
+    try:
+        payload = {"model": model, "keep_alive": keep_alive, "stream": False}
+        r, _ = transport.post(HEALTH_CHANNEL, OLLAMA_URL, json=payload, read_timeout=300, retries=0)
+        return r.status_code == 200
+    except Exception:
+        return False
+
+
+def _server_stats(data):
+    """Timing fields of Ollama's final response, converted to seconds"""
+    stats = {}
+    for key in ("load_duration", "prompt_eval_duration", "eval_duration", "total_duration"):
+        if key in data:
+            stats[key] = data[key] / 1e9
+    for key in ("prompt_eval_count", "eval_count"):
+        if key in data:
+            stats[key] = data[key]
+    return stats
+
+
+def describe_stats(stats):
+    """One-line summary of Ollama's prompt-eval and eval statistics"""
+    if not stats:
+        return ""
+    prompt_tokens = stats.get("prompt_eval_count", 0)
+    return (f"load {stats.get('load_duration', 0):.2f}s, "
+            f"prompt eval {prompt_tokens} tok in {stats.get('prompt_eval_duration', 0):.2f}s, "
+            f"eval {stats.get('eval_count', 0)} tok in {stats.get('eval_duration', 0):.2f}s")
+
+
+def _ndjson_tokens(response, timing):
+    """Generated text pieces from Ollama's newline-delimited JSON stream"""
+    for line in transport.iter_lines(response, timing):
+        if not line:
+            continue
+        data = json.loads(line)
+        if data.get("error"):
+            raise RuntimeError(data["error"])
+        token = data.get("response", "")
+        if token:
+            transport.mark_first_token(timing)
+            yield token
+        if data.get("done"):
+            timing.server_stats = _server_stats(data)
+            if data.get("done_reason") == "stop":
+                yield STATEMENT_STOP
+
+
+def generate_sql_with_ollama(prompt: str, model: str = DEFAULT_OLLAMA_MODEL, stream: bool = False, on_token=None, cancel=None,
+                             keep_alive: str = DEFAULT_KEEP_ALIVE, temperature: float = 0.2) -> Optional[str]:
+    """Generate SQL using Ollama.
+
+    With stream=True tokens are passed to on_token as they arrive and the
+    stream ends with the first complete statement: the server is asked to
+    stop at ';', and the rest is read or dropped once a statement is in.
+    Setting the ``cancel`` event drops it at once (the result is then None). Server
+    statistics land in the request timing's ``server_stats`` when Ollama
+    sent its final message (always without streaming).
+    """
     try:
         payload = {
             "model": model,
             "prompt": prompt,
-            "stream": False,
+            "stream": stream,
+            "keep_alive": keep_alive,
             "options": {
-                "temperature": 0.2,
+                "temperature": temperature,
                 "num_predict": 512
             }
         }
 
-        r = requests.post(OLLAMA_URL, json=payload, timeout=60)
-        r.raise_for_status()
+        if stream:
+            payload["options"]["stop"] = [STATEMENT_STOP]
 
-        response_data = r.json()
-        content = response_data.get("response", "").strip()
+        r, timing = transport.post("ollama", OLLAMA_URL, json=payload, read_timeout=60, stream=stream)
+        if stream:
+            try:
+                r.raise_for_status()
+                tokens = _ndjson_tokens(r, timing)
+                content = collect_sql_stream(tokens, on_token, cancel).strip()
+                if cancel is None or not cancel.is_set():
+                    transport.drain(tokens)
+            finally:
+                r.close()
+                transport.finish(timing)
+            if cancel is not None and cancel.is_set():
+                return None
+        else:
+            r.raise_for_status()
+            response_data = r.json()
+            timing.server_stats = _server_stats(response_data)
+            content = response_data.get("response", "").strip()
         return content if content else None
 
     except requests.exceptions.Timeout:
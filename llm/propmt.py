@@ -1,17 +1,59 @@
-def build_prompt(question, schema):
-    if schema:
-        schema_text = "\n".join(
-            f"{t}.{c} ({d})" for t, c, d in schema
-        )
-    else:
-        schema_text = "No schema information available"
+def estimate_tokens(text):
+    """Rough token count for prompt budgeting (about 4 characters per token)"""
+    return (len(text) + 3) // 4
 
+
+def encode_table(table, info, max_tokens=None):
+    """Compact one-line encoding of a table for the prompt, e.g.
+
+    ``orders(id int pk, customer_id int fk→customers.id, total decimal(10,2))``
+
+    With max_tokens the column list is cut short (ending in ``...``) so the
+    line fits the budget.
+    """
+    refs = {}
+    for fk in info.get("foreign_keys", ()):
+        for column, ref_column in zip(fk["columns"], fk["ref_columns"]):
+            refs[column] = f"{fk['ref_table']}.{ref_column}"
+    primary_key = set(info.get("primary_key", ()))
+
+    parts = []
+    for name, col_type, _ in info["columns"]:
+        part = f"{name} {col_type}"
+        if name in primary_key:
+            part += " pk"
+        if name in refs:
+            part += f" fk→{refs[name]}"
+        parts.append(part)
+
+    suffix = f" -- {info['comment']}" if info.get("comment") else ""
+    line = f"{table}({', '.join(parts)}){suffix}"
+    while max_tokens is not None and parts and estimate_tokens(line) > max_tokens:
+        parts.pop()
+        line = f"{table}({', '.join(parts + ['...'])})"
+    return line
+
+
+def encode_verbose(schema):
+    """The original one-line-per-column schema text, kept for size comparisons"""
+    return "\n".join(f"{t}.{c} ({d})" for t, c, d in schema)
+
+
+def build_prompt(question, schema, schema_text=None):
+    if schema_text is None:
+        if getattr(schema, "tables", None):
+            schema_text = "\n".join(encode_table(t, info) for t, info in schema.tables.items())
+        elif schema:
+            schema_text = encode_verbose(schema)
+        else:
+            schema_text = "No schema information available"
+
+    # Fixed text first, schema next and the question last: everything before
+    # the question stays byte-identical between questions, so servers that
+    # cache the prompt prefix (Ollama's KV cache) only evaluate the tail.
     return f"""
 You are an expert MYSQL assistant.
 
-SCHEMA:
-{schema_text}
-
 RULES:
 - Generate a SINGLE SQL query (not multiple queries)
 - Only generate SQL queries
@@ -21,8 +63,11 @@ RULES:
 - Generate valid MySQL syntax
 - For "describe tables" requests, use SELECT from information_schema or SHOW TABLES
 
+SCHEMA:
+{schema_text}
+
 QUESTION:
 {question}
 
 SQL:
-"""
\ No newline at end of file
+"""
@@ -0,0 +1,278 @@
+import queue
+import threading
+import time
+
+from utils.sql_cleaner import extract_sql
+from . import transport
+from . import health
+from .generator import generate_sql, generate_sql_with_ollama, NVIDIA_MODEL, DEFAULT_OLLAMA_MODEL
+from .ollama_generator import DEFAULT_KEEP_ALIVE, preload_ollama
+
+DEFAULT_HEDGE_DELAY = 2.0   # seconds, until enough latency samples exist
+HEDGE_MIN_SAMPLES = 5
+HEDGE_PERCENTILE = 0.9
+
+DEFAULT_CIRCUIT_FAILURES = 3    # consecutive HTTP-level failures before opening
+DEFAULT_CIRCUIT_COOLDOWN = 30   # seconds before the first background probe
+MAX_CIRCUIT_COOLDOWN = 300
+
+
+class CircuitBreaker:
+    """Health state of one provider: closed → open → half-open → closed.
+
+    Failures without any HTTP response (timeouts, refused connections) open
+    the circuit at once, since the next question would only wait for the
+    same timeout again; failures with a response (5xx after retries, bad
+    payloads) open it after ``threshold`` in a row. While open, a background
+    timer probes the provider and closes the circuit when it answers.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half-open"
+
+    def __init__(self, name, probe, threshold=DEFAULT_CIRCUIT_FAILURES, cooldown=DEFAULT_CIRCUIT_COOLDOWN):
+        self.name = name
+        self.probe = probe
+        self.threshold = threshold
+        self.base_cooldown = cooldown
+        self.cooldown = cooldown
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.lock = threading.Lock()
+
+    def allow(self):
+        return self.state == self.CLOSED
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.state = self.CLOSED
+            self.cooldown = self.base_cooldown
+
+    def record_failure(self, hard=False):
+        with self.lock:
+            self.failures += 1
+            if self.state != self.CLOSED or (not hard and self.failures < self.threshold):
+                return
+            self.state = self.OPEN
+            self.opened_at = time.time()
+        print(f"⚠️ {self.name} circuit opened after {self.failures} failure(s); probing again in {self.cooldown:.0f}s")
+        self._schedule_probe()
+
+    def _schedule_probe(self):
+        timer = threading.Timer(self.cooldown, self._run_probe)
+        timer.daemon = True
+        timer.start()
+
+    def _run_probe(self):
+        with self.lock:
+            self.state = self.HALF_OPEN
+        healthy = False
+        try:
+            healthy = self.probe()
+        except Exception:
+            pass
+        if healthy:
+            self.record_success()
+            return
+        with self.lock:
+            self.state = self.OPEN
+            self.cooldown = min(self.cooldown * 2, MAX_CIRCUIT_COOLDOWN)
+        self._schedule_probe()
+
+    def status(self):
+        text = self.state
+        if self.state != self.CLOSED and self.opened_at:
+            text += f" for {time.time() - self.opened_at:.0f}s"
+        if self.failures:
+            text += f", {self.failures} consecutive failure(s)"
+        return text
+
+
+class Provider:
+    """One LLM backend behind a common generate() signature and health state"""
+
+    def __init__(self, name, model, generate, probe, config):
+        self.name = name
+        self.model = model
+        self._generate = generate
+        self.breaker = CircuitBreaker(
+            name, probe,
+            threshold=config.get("circuit_failures", DEFAULT_CIRCUIT_FAILURES),
+            cooldown=config.get("circuit_cooldown", DEFAULT_CIRCUIT_COOLDOWN)
+        )
+
+    def attempt(self, prompt, stream=False, on_token=None, cancel=None, temperature=None):
+        """One request that leaves the circuit breaker alone.
+
+        Returns ``(output, outcome)``; outcome is "ok", "failed",
+        "unreachable" (no HTTP answer, or one that broke off) or "cancelled".
+        """
+        transport.clear_thread_timing()
+        options = {} if temperature is None else {"temperature": temperature}
+        output = self._generate(prompt, stream=stream, on_token=on_token, cancel=cancel, **options)
+        if cancel is not None and cancel.is_set():
+            return output, "cancelled"
+        if output is not None:
+            return output, "ok"
+        timing = transport.thread_timing()
+        # No HTTP status at all means we never got an answer (timeout/refused)
+        return None, "unreachable" if timing is not None and timing.status is None else "failed"
+
+    def record(self, outcome):
+        """Report an attempt() outcome to the circuit breaker"""
+        if outcome == "ok":
+            self.breaker.record_success()
+        elif outcome in ("failed", "unreachable"):
+            self.breaker.record_failure(hard=outcome == "unreachable")
+
+    def generate(self, prompt, stream=False, on_token=None, cancel=None, temperature=None):
+        output, outcome = self.attempt(prompt, stream, on_token, cancel, temperature)
+        self.record(outcome)
+        return output
+
+
+def build_providers(config, api_key):
+    """Providers usable with the current config, keyed by name"""
+    providers = {}
+    probe_config = dict(config, api_key=api_key)
+    if api_key:
+        providers["nvidia"] = Provider(
+            "nvidia", NVIDIA_MODEL,
+            lambda prompt, **kw: generate_sql(prompt, api_key, **kw),
+            lambda: health.check("nvidia", probe_config)[0],
+            config
+        )
+    model = config.get("ollama_model", DEFAULT_OLLAMA_MODEL)
+    keep_alive = config.get("ollama_keep_alive", DEFAULT_KEEP_ALIVE)
+    providers["ollama"] = Provider(
+        "ollama", model,
+        lambda prompt, **kw: generate_sql_with_ollama(prompt, model, keep_alive=keep_alive, **kw),
+        lambda: health.check("ollama", probe_config)[0],
+        config
+    )
+    return providers
+
+
+class ProviderRegistry:
+    """Configured providers in failover order, skipping those with an open circuit"""
+
+    def __init__(self, config, api_key, primary):
+        self.config = config
+        self.providers = build_providers(config, api_key)
+        self.primary = primary
+        self.order = [primary] + [name for name in self.providers if name != primary]
+        if not config.get("llm_failover", True):
+            self.order = [primary]
+
+    def get(self, name):
+        return self.providers.get(name)
+
+    def preload(self):
+        """Load the Ollama model in the background when it will serve questions"""
+        if "ollama" not in self.providers:
+            return
+        if self.primary != "ollama" and not self.config.get("llm_race", False):
+            return
+        model = self.providers["ollama"].model
+        keep_alive = self.config.get("ollama_keep_alive", DEFAULT_KEEP_ALIVE)
+        threading.Thread(target=preload_ollama, args=(model, keep_alive), daemon=True).start()
+
+    def available(self):
+        return [self.providers[name] for name in self.order
+                if name in self.providers and self.providers[name].breaker.allow()]
+
+    def generate(self, prompt, stream=False, on_token=None):
+        """Try each available provider in order until one answers.
+
+        Returns ``(raw_output, provider_name)``; the name is None when every
+        provider failed or had its circuit open.
+        """
+        candidates = self.available()
+        if candidates and candidates[0].name != self.primary:
+            print(f"↪ {self.primary} is unavailable, using {candidates[0].name}")
+        for i, provider in enumerate(candidates):
+            output = provider.generate(prompt, stream=stream, on_token=on_token)
+            if output is not None:
+                return output, provider.name
+            if i + 1 < len(candidates):
+                print(f"\n↪ {provider.name} failed, failing over to {candidates[i + 1].name}")
+        return None, None
+
+    def status(self):
+        lines = []
+        for name in self.order:
+            provider = self.providers.get(name)
+            if provider is None:
+                lines.append(f"{name}: not configured")
+            else:
+                lines.append(f"{name} ({provider.model}): {provider.breaker.status()}")
+        return "\n".join(lines)
+
+
+def hedge_delay(provider, config):
+    """Seconds to wait on the primary before hedging.
+
+    ``race_hedge_delay`` may be a number or "auto" (the default), which uses
+    the p90 of the provider's recent request latencies.
+    """
+    setting = config.get("race_hedge_delay", "auto")
+    if setting != "auto":
+        return float(setting)
+    samples = sorted(t.total for t in transport.recent_timings(provider.name) if t.status == 200)
+    if len(samples) < HEDGE_MIN_SAMPLES:
+        return DEFAULT_HEDGE_DELAY
+    return samples[min(len(samples) - 1, int(len(samples) * HEDGE_PERCENTILE))]
+
+
+def race(primary, secondary, prompt, delay):
+    """Hedged generation: primary first, secondary after ``delay`` seconds.
+
+    The secondary also starts at once if the primary fails early. The first
+    output that extract_sql accepts wins and the other request is cancelled.
+    Both requests stream, even when the session does not echo tokens, since
+    a response is only dropped (and its connection freed) between chunks; a
+    cancelled request records no outcome on its provider's circuit breaker.
+    Returns ``(raw_output, winner_name, hedged)``; raw_output is None when
+    neither provider produced usable SQL.
+    """
+    results = queue.Queue()
+    cancels = {}
+    start = time.perf_counter()
+
+    def run(provider):
+        cancel = threading.Event()
+        cancels[provider.name] = cancel
+        thread = threading.Thread(
+            target=lambda: results.put((provider.name, provider.generate(prompt, stream=True, cancel=cancel))),
+            daemon=True
+        )
+        thread.start()
+
+    run(primary)
+    running = 1
+    hedged = False
+    last_output = None
+    while running:
+        timeout = None if hedged else max(0.0, delay - (time.perf_counter() - start))
+        try:
+            name, output = results.get(timeout=timeout)
+        except queue.Empty:
+            hedged = True
+            run(secondary)
+            running += 1
+            continue
+
+        running -= 1
+        if extract_sql(output):
+            for other, cancel in cancels.items():
+                if other != name:
+                    cancel.set()
+            return output, name, hedged
+        last_output = output if output else last_output
+        if not hedged:
+            hedged = True
+            run(secondary)
+            running += 1
+
+    return last_output, None, hedged
@@ -0,0 +1,178 @@
+import math
+import re
+from collections import Counter, defaultdict
+
+from llm.propmt import encode_table, encode_verbose, estimate_tokens
+
+# Defaults for the per-question schema selection (overridable in config)
+DEFAULT_TOP_K = 8
+DEFAULT_TOKEN_BUDGET = 3000
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+# How many times a table's own name counts compared to a column name
+TABLE_NAME_WEIGHT = 3
+
+STOPWORDS = {
+    "a", "all", "an", "and", "any", "are", "as", "at", "by", "count", "each", "every",
+    "find", "for", "from", "get", "give", "how", "i", "in", "is", "it", "list", "many",
+    "me", "much", "of", "on", "or", "per", "show", "tell", "than", "that", "the", "their",
+    "there", "to", "was", "were", "what", "when", "where", "which", "who", "with",
+}
+
+_WORD_RE = re.compile(r"[A-Za-z0-9]+")
+_CAMEL_RE = re.compile(r"(?<=[a-z0-9])(?=[A-Z])")
+
+
+def _stem(word):
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+def tokenize(text):
+    """Split identifiers and prose into lowercase stemmed terms"""
+    terms = []
+    for word in _WORD_RE.findall(_CAMEL_RE.sub(" ", text or "")):
+        word = word.lower()
+        if word not in STOPWORDS:
+            terms.append(_stem(word))
+    return terms
+
+
+def _trigrams(term):
+    padded = f"  {term} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class SchemaIndex:
+    """BM25 index over the tables of a DatabaseSchema, built once per schema load.
+
+    Each table is a document made of its name, column names, comments and the
+    names of the tables it shares a foreign key with. Query terms that never
+    occur in the schema are matched to similar schema terms by trigram overlap
+    so abbreviations and typos still find their table.
+    """
+
+    def __init__(self, schema):
+        self.schema = schema
+        self.neighbours = defaultdict(set)
+        for table, info in schema.tables.items():
+            for fk in info["foreign_keys"]:
+                if fk["ref_table"] in schema.tables and fk["ref_table"] != table:
+                    self.neighbours[table].add(fk["ref_table"])
+                    self.neighbours[fk["ref_table"]].add(table)
+
+        self.docs = {}
+        self.doc_len = {}
+        df = Counter()
+        for table, info in schema.tables.items():
+            terms = tokenize(table) * TABLE_NAME_WEIGHT + tokenize(info["comment"])
+            for name, _, comment in info["columns"]:
+                terms += tokenize(name) + tokenize(comment)
+            for other in self.neighbours[table]:
+                terms += tokenize(other)
+            counts = Counter(terms)
+            self.docs[table] = counts
+            self.doc_len[table] = len(terms)
+            df.update(counts.keys())
+
+        n = len(self.docs) or 1
+        self.avg_len = (sum(self.doc_len.values()) / n) or 1
+        self.idf = {term: math.log(1 + (n - f + 0.5) / (f + 0.5)) for term, f in df.items()}
+
+        self.trigram_index = defaultdict(set)
+        for term in self.idf:
+            for gram in _trigrams(term):
+                self.trigram_index[gram].add(term)
+
+        # Precompiled prompt text per table, plus whole-schema sizes for comparison
+        self.table_text = {table: encode_table(table, info) for table, info in schema.tables.items()}
+        self.table_tokens = {table: estimate_tokens(text) for table, text in self.table_text.items()}
+        self.compact_tokens = estimate_tokens("\n".join(self.table_text.values()))
+        self.verbose_tokens = estimate_tokens(encode_verbose(schema))
+
+    def _expand(self, term):
+        """Schema terms similar to an unknown query term, with their similarity"""
+        grams = _trigrams(term)
+        candidates = Counter()
+        for gram in grams:
+            for other in self.trigram_index.get(gram, ()):
+                candidates[other] += 1
+        matches = []
+        for other, shared in candidates.items():
+            similarity = shared / len(grams | _trigrams(other))
+            if similarity >= 0.5:
+                matches.append((similarity, other))
+        return [(other, sim) for sim, other in sorted(matches, reverse=True)[:2]]
+
+    def score(self, question):
+        """BM25 score of every table that matches at least one question term"""
+        weights = Counter()
+        for term in tokenize(question):
+            if term in self.idf:
+                weights[term] += 1.0
+            else:
+                for other, similarity in self._expand(term):
+                    weights[other] += similarity
+
+        scores = Counter()
+        for table, counts in self.docs.items():
+            norm = K1 * (1 - B + B * self.doc_len[table] / self.avg_len)
+            total = 0.0
+            for term, weight in weights.items():
+                tf = counts.get(term)
+                if tf:
+                    total += weight * self.idf[term] * tf * (K1 + 1) / (tf + norm)
+            if total > 0:
+                scores[table] = total
+        return scores
+
+    def select(self, question, top_k=DEFAULT_TOP_K, prune=True):
+        """Rank the top_k tables for a question, followed by their join partners"""
+        scores = self.score(question) if prune else None
+        if not scores:
+            # Pruning off, or nothing matched (e.g. "describe the database")
+            return list(self.table_text)
+
+        ranked = [table for table, _ in scores.most_common(top_k)]
+        partners = []
+        for table in ranked:
+            for other in sorted(self.neighbours[table], key=lambda t: -scores.get(t, 0)):
+                if other not in ranked and other not in partners:
+                    partners.append(other)
+        return ranked + partners
+
+    def context(self, question, top_k=DEFAULT_TOP_K, token_budget=DEFAULT_TOKEN_BUDGET, prune=True):
+        """Schema text for one question, never larger than token_budget.
+
+        Returns ``(tables, text, tokens)``. Tables are taken in rank order while
+        they fit; if even the best one is too large on its own, its column
+        list is cut short instead of sending nothing. The text lists them in
+        schema order, so questions about the same tables share a prefix.
+        """
+        candidates = self.select(question, top_k, prune)
+        selected = []
+        used = 0
+        for table in candidates:
+            # +1 covers the joining newline so the estimate stays an upper bound
+            cost = self.table_tokens[table] + 1
+            if used + cost > token_budget:
+                continue
+            selected.append(table)
+            used += cost
+
+        if selected:
+            chosen = set(selected)
+            text = "\n".join(self.table_text[t] for t in self.table_text if t in chosen)
+        elif candidates:
+            first = candidates[0]
+            selected = [first]
+            text = encode_table(first, self.schema.tables[first], max_tokens=token_budget)
+        else:
+            text = ""
+        return selected, text, estimate_tokens(text)
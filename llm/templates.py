@@ -0,0 +1,108 @@
+import re
+from datetime import datetime
+
+from llm.cache import normalize_question
+from utils.sql_lexer import tokenize_sql
+
+# Literals pulled out of a question: quoted text, ISO dates and plain numbers
+_QUESTION_LITERAL_RE = re.compile(
+    r"""'([^']*)'|"([^"]*)"|(?<![\w.-])(\d{4}-\d{2}-\d{2})(?![\w-])|(?<![\w.])(\d+(?:\.\d+)?)(?!\w)(?!\.\d)"""
+)
+
+
+def split_question(question):
+    """Return ``(shape, values)`` where literals are replaced by typed slots.
+
+    ``values`` is a list of ``(kind, text)`` with kind ``str``, ``date`` or
+    ``num``; two questions with the same shape differ only in those values.
+    """
+    values = []
+
+    def slot(match):
+        quoted, dquoted, date, number = match.groups()
+        if date is not None:
+            values.append(("date", date))
+            return "{date}"
+        if number is not None:
+            values.append(("num", number))
+            return "{num}"
+        values.append(("str", quoted if quoted is not None else dquoted))
+        return "{str}"
+
+    shape = _QUESTION_LITERAL_RE.sub(slot, question)
+    return normalize_question(shape), values
+
+
+def _matches(kind, value, token):
+    if token.kind == "string":
+        return token.value == value
+    if token.kind == "number" and kind == "num":
+        try:
+            return float(token.text) == float(value)
+        except ValueError:
+            return False
+    return False
+
+
+def make_template(question, sql):
+    """Parameterize sql by the literals of the question it answers.
+
+    Returns a template dict, or None when the mapping is not unambiguous:
+    every question literal must appear exactly once in the SQL, and no two
+    question literals may share a value.
+    """
+    _, values = split_question(question)
+    if not values or len({v for _, v in values}) != len(values):
+        return None
+
+    literals = [t for t in tokenize_sql(sql) if t.kind in ("string", "number")]
+    spans = []
+    for slot, (kind, value) in enumerate(values):
+        found = [t for t in literals if _matches(kind, value, t)]
+        if len(found) != 1:
+            return None
+        token = found[0]
+        quote = token.text[0] if token.kind == "string" else ""
+        spans.append([token.start, token.end, slot, quote])
+
+    spans.sort()
+    return {"sql": sql, "spans": spans, "kinds": [kind for kind, _ in values]}
+
+
+def _render_value(kind, value, quote, original):
+    if kind == "date":
+        datetime.strptime(value, "%Y-%m-%d")
+    if not quote:
+        if kind != "num" or not re.fullmatch(r"\d+(?:\.\d+)?", value):
+            raise ValueError(f"{value!r} is not a number")
+        # An integer in the SQL may be a LIMIT/OFFSET, where 2.5 is a syntax error
+        if original.isdigit() and not value.isdigit():
+            raise ValueError(f"{value!r} is not an integer")
+        return value
+    escaped = value.replace("\\", "\\\\").replace(quote, quote * 2)
+    return f"{quote}{escaped}{quote}"
+
+
+def fill_template(template, question):
+    """SQL for question from a stored template, or None if the shapes disagree.
+
+    Also None when a value does not fit its slot, such as a decimal where
+    the SQL had an integer, so the question goes to the LLM instead.
+    """
+    _, values = split_question(question)
+    if [kind for kind, _ in values] != template["kinds"]:
+        return None
+
+    sql = template["sql"]
+    parts = []
+    pos = 0
+    try:
+        for start, end, slot, quote in template["spans"]:
+            kind, value = values[slot]
+            parts.append(sql[pos:start])
+            parts.append(_render_value(kind, value, quote, sql[start:end]))
+            pos = end
+    except (ValueError, IndexError):
+        return None
+    parts.append(sql[pos:])
+    return "".join(parts)
@@ -0,0 +1,252 @@
+import random
+import threading
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import ReadTimeoutError
+
+CONNECT_TIMEOUT = 5     # seconds to establish TCP (+TLS)
+READ_TIMEOUT = 60       # seconds between bytes of the response
+MAX_RETRIES = 3         # extra attempts after the first one
+BACKOFF_BASE = 0.5      # seconds, doubled per attempt
+BACKOFF_CAP = 8         # longest single backoff sleep
+RETRY_AFTER_CAP = 30    # longest Retry-After we are willing to honour
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+POOL_SIZE = 8           # keep-alive connections per host
+DRAIN_BYTES = 64 * 1024 # most of a stream's tail read to keep its connection
+DRAIN_SECONDS = 0.5
+
+_local = threading.local()
+
+
+class _TimedHTTPConnection(HTTPConnection):
+    def connect(self):
+        start = time.perf_counter()
+        super().connect()
+        _local.connect_time = getattr(_local, "connect_time", 0.0) + time.perf_counter() - start
+
+
+class _TimedHTTPSConnection(HTTPSConnection):
+    def connect(self):
+        start = time.perf_counter()
+        super().connect()
+        _local.connect_time = getattr(_local, "connect_time", 0.0) + time.perf_counter() - start
+
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+class _TimedAdapter(HTTPAdapter):
+    """Keep-alive adapter whose connections report their TCP/TLS setup time"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _TimedHTTPConnectionPool,
+            "https": _TimedHTTPSConnectionPool,
+        }
+
+
+class RequestTiming:
+    """Latency of one logical request (all attempts) split into phases"""
+
+    def __init__(self, provider):
+        self.provider = provider
+        self.connect = 0.0   # TCP/TLS setup; 0 when a pooled connection was reused
+        self.ttfb = 0.0      # request sent → response headers received (last attempt)
+        self.total = 0.0     # first attempt → body fully read, including backoff
+        self.first_token = None  # streaming only: start → first generated token
+        self.server_stats = {}   # provider-reported timings (Ollama eval stats)
+        self.attempts = 0
+        self.status = None
+        self.started = time.perf_counter()
+
+    def summary(self):
+        connect = f"{self.connect:.3f}s" if self.connect else "reused"
+        text = f"connect {connect}, TTFB {self.ttfb:.3f}s"
+        if self.first_token is not None:
+            text += f", first token {self.first_token:.3f}s"
+        text += f", total {self.total:.3f}s"
+        if self.attempts > 1:
+            text += f", {self.attempts} attempts"
+        return text
+
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+_timings = {}
+
+
+def get_session(provider):
+    """Shared keep-alive session for one provider"""
+    with _sessions_lock:
+        session = _sessions.get(provider)
+        if session is None:
+            session = requests.Session()
+            adapter = _TimedAdapter(pool_connections=2, pool_maxsize=POOL_SIZE)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _sessions[provider] = session
+            _timings[provider] = deque(maxlen=50)
+        return session
+
+
+def recent_timings(provider):
+    """Latest RequestTimings of a provider, oldest first"""
+    return list(_timings.get(provider, ()))
+
+
+def last_timing(provider):
+    timings = _timings.get(provider)
+    return timings[-1] if timings else None
+
+
+def thread_timing():
+    """Timing of the last request finished on this thread since clear_thread_timing().
+
+    Unlike last_timing() it can't belong to a concurrent request of the
+    same provider.
+    """
+    return getattr(_local, "timing", None)
+
+
+def clear_thread_timing():
+    _local.timing = None
+
+
+def _retry_after(response):
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            seconds = parsedate_to_datetime(value).timestamp() - time.time()
+        except (TypeError, ValueError):
+            return None
+    return min(max(seconds, 0.0), RETRY_AFTER_CAP)
+
+
+def _backoff(attempt):
+    # Full jitter: anywhere between 0 and the exponential ceiling
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+
+
+def request(provider, method, url, read_timeout=READ_TIMEOUT, retries=MAX_RETRIES, stream=False, **kwargs):
+    """Send a request over the provider's pooled session with bounded retries.
+
+    Connection failures and 429/5xx responses are retried with jittered
+    exponential backoff, honouring Retry-After. Read timeouts are not
+    retried: the server may still be working on the first attempt.
+
+    Returns ``(response, timing)``. With stream=False the body has been read
+    and the timing is recorded; with stream=True the caller reads the body
+    and calls ``finish(timing)`` when done. The last response is returned
+    even if its status is an error, so callers keep using raise_for_status().
+    """
+    session = get_session(provider)
+    timing = RequestTiming(provider)
+    attempt = 0
+    while True:
+        attempt += 1
+        timing.attempts = attempt
+        _local.connect_time = 0.0
+        try:
+            response = session.request(
+                method, url, timeout=(CONNECT_TIMEOUT, read_timeout), stream=stream, **kwargs
+            )
+        except requests.exceptions.ConnectionError:
+            timing.connect += _local.connect_time
+            if attempt > retries:
+                finish(timing)
+                raise
+            time.sleep(_backoff(attempt - 1))
+            continue
+        except requests.exceptions.Timeout:
+            finish(timing)
+            raise
+
+        timing.connect += _local.connect_time
+        timing.ttfb = response.elapsed.total_seconds()
+        timing.status = response.status_code
+        if response.status_code in RETRY_STATUSES and attempt <= retries:
+            delay = _retry_after(response)
+            response.close()
+            time.sleep(delay if delay is not None else _backoff(attempt - 1))
+            continue
+
+        if not stream:
+            response.content  # read the body so total covers the download
+            finish(timing)
+        return response, timing
+
+
+def finish(timing):
+    """Close out a timing once the response body has been consumed"""
+    timing.total = time.perf_counter() - timing.started
+    _timings.setdefault(timing.provider, deque(maxlen=50)).append(timing)
+    _local.timing = timing
+    return timing
+
+
+def iter_lines(response, timing):
+    """Lines of a streamed body, failing the way the request itself would.
+
+    requests reports a read timeout mid-body as ConnectionError and a
+    dropped connection as ChunkedEncodingError; they are raised as Timeout
+    and ConnectionError instead, and the timing loses its status, since an
+    answer that broke off counts as no answer (see Provider.attempt).
+    """
+    try:
+        yield from response.iter_lines(chunk_size=None)
+    except requests.exceptions.ConnectionError as e:
+        timing.status = None
+        if e.args and isinstance(e.args[0], ReadTimeoutError):
+            raise requests.exceptions.ReadTimeout(*e.args) from e
+        raise
+    except requests.exceptions.ChunkedEncodingError as e:
+        timing.status = None
+        raise requests.exceptions.ConnectionError(*e.args) from e
+
+
+def drain(chunks):
+    """Read what is left of a streamed body through the iterator reading it.
+
+    urllib3 closes the connection when a body reader is abandoned halfway,
+    so a short tail is read to the end and the connection goes back to the
+    pool; a stream still going after a small byte/time budget is dropped.
+    """
+    deadline = time.perf_counter() + DRAIN_SECONDS
+    read = 0
+    try:
+        for chunk in chunks:
+            read += len(chunk)
+            if read > DRAIN_BYTES or time.perf_counter() > deadline:
+                return False
+    except Exception:
+        return False
+    return True
+
+
+def mark_first_token(timing):
+    if timing.first_token is None:
+        timing.first_token = time.perf_counter() - timing.started
+
+
+def post(provider, url, **kwargs):
+    return request(provider, "POST", url, **kwargs)
+
+
+def get(provider, url, **kwargs):
+    return request(provider, "GET", url, **kwargs)
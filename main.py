@@ -1,11 +1,11 @@
 from app.banner import show_banner
 from config.store import load_config, save_config
-from llm.generator import test_api_key, test_ollama_connection, generate_sql_with_ollama
-from db.connection import connect_server, connect_database
-from db.schema import list_databases, get_database_schema
-from app.cli import start_cli
 import sys
 import os
+import threading
+
+# mysql.connector, requests and the llm package take far longer to import
+# than the menus take to draw, so they are imported where first needed.
 
 
 def secure_input(prompt=""):
@@ -52,6 +52,13 @@ def secure_input(prompt=""):
 
 
 def main():
+    if sys.argv[1:2] == ["batch"]:
+        from app.batch import run_batch
+        sys.exit(run_batch(sys.argv[2:]))
+    if "--startup-profile" in sys.argv[1:]:
+        from app.startup import startup_profile
+        sys.exit(startup_profile())
+
     show_banner()
     config = load_config()
 
@@ -59,6 +66,9 @@ def main():
     if "llm_provider" not in config:
         config["llm_provider"] = "nvidia"  # Default to NVIDIA
 
+    # Warm the provider health cache (and its imports) while the user reads the menu
+    threading.Thread(target=warm_up, args=(config,), daemon=True).start()
+
     # ---------- MAIN MENU ----------
     while True:
         print("\n" + "="*50)
@@ -76,9 +86,12 @@ def main():
             if not config.get("api_key") and config.get("llm_provider") == "nvidia":
                 print("❌ NVIDIA API key not configured. Please set it up first.")
                 continue
-            if config.get("llm_provider") == "ollama" and not test_ollama_connection():
-                print("❌ Ollama not running. Please start Ollama first.")
-                continue
+            if config.get("llm_provider") == "ollama":
+                from llm.health import provider_health
+                ok, detail = provider_health("ollama", config)
+                if not ok:
+                    print(f"❌ Ollama not ready: {detail}. Please start Ollama first.")
+                    continue
             start_snapbase(config)
             
         elif main_choice == "2":
@@ -91,12 +104,20 @@ def main():
             manage_profiles(config)
             
         elif main_choice == "5":
+            if "db.pool" in sys.modules:
+                sys.modules["db.pool"].close_pools()
             print("👋 Goodbye!")
             return
         else:
             print("⚠️ Invalid option, try again")
 
 
+def warm_up(config):
+    """Background start-up work: import the LLM stack and probe the provider"""
+    from llm.health import refresh_in_background
+    refresh_in_background(config["llm_provider"], config)
+
+
 def manage_api_key(config):
     """Manage API Key operations"""
     while True:
@@ -118,6 +139,7 @@ def manage_api_key(config):
                 print("❌ No API key saved")
                 
         elif choice == "2":
+            from llm.generator import test_api_key
             api_key = secure_input("Enter NVIDIA API key: ").strip()
             print("Validating API key...")
             if not test_api_key(api_key):
@@ -166,8 +188,10 @@ def manage_llm_provider(config):
             print("✔ LLM provider set to NVIDIA")
             
         elif choice == "2":
-            if not test_ollama_connection():
-                print("❌ Ollama is not running. Please start Ollama first.")
+            from llm.health import provider_health
+            ok, detail = provider_health("ollama", config)
+            if not ok:
+                print(f"❌ Ollama is not ready: {detail}")
                 print("Run 'ollama serve' in a terminal to start the Ollama service.")
             else:
                 config["llm_provider"] = "ollama"
@@ -249,92 +273,114 @@ def profile_menu(config, profile_idx):
 
 def use_profile(config, profile_idx):
     """Connect using a saved profile"""
+    from db.pool import get_pool
+    from app.cli import start_cli
+    from llm.providers import ProviderRegistry
+
     profile = config["db_profiles"][profile_idx]
     
     # Ask for password with secure input
     password = secure_input(f"Enter password for {profile['user']}: ").strip()
     
+    # One pooled connection serves the whole session; SHOW DATABASES and
+    # database switches run on it instead of opening new connections
+    pool = get_pool(profile["host"], profile["user"], password, config)
     try:
-        server = connect_server(profile["host"], profile["user"], password)
+        conn = pool.acquire()
     except Exception as e:
         print(f"❌ Cannot connect: {e}")
         return
     
-    databases = list_databases(server)
-    if not databases:
-        print("❌ No databases found")
-        server.close()
+    db_name = choose_database(conn)
+    if not db_name:
+        pool.release(conn)
         return
     
-    print("\nAvailable Databases:")
-    for i, db in enumerate(databases, 1):
-        print(f"{i}. {db}")
-    
-    while True:
-        choice = input("Choose database number: ").strip()
-        if choice.isdigit() and 1 <= int(choice) <= len(databases):
-            db_name = databases[int(choice) - 1]
-            break
-        print("⚠️ Invalid selection, try again")
-    
-    server.close()
-    
-    # Connect to database
-    conn = connect_database(profile["host"], profile["user"], password, db_name)
-    print(f"✔ Connected to database: {db_name}")
-    
     try:
-        schema = get_database_schema(conn)
+        pool.switch(conn, db_name)
+        print(f"✔ Connected to database: {db_name}")
+        schema = load_schema(config, profile, conn)
     except Exception as e:
         print(f"❌ Error loading schema: {e}")
-        conn.close()
+        pool.release(conn)
         return
     
+    # Circuit breakers and health history outlive database switches and schema refreshes
+    api_key = config.get("api_key")
+    llm_provider = config.get("llm_provider", "nvidia")
+    providers = ProviderRegistry(config, api_key, llm_provider)
+    providers.preload()
+
     # Start CLI with database switching capability
     while True:
-        action = start_cli(conn, schema, config.get("api_key"), config.get("llm_provider", "nvidia"))
+        action = start_cli(conn, schema, api_key, llm_provider, config, pool, providers)
+        if action == "REFRESH_SCHEMA":
+            try:
+                schema = load_schema(config, profile, conn, refresh=True)
+            except Exception as e:
+                print(f"❌ Error loading schema: {e}")
+            continue
         if action != "SWITCH_DB":
             break
         
-        # Switch to different database
+        # Switch to different database on the same connection
         try:
-            conn.close()
-            server = connect_server(profile["host"], profile["user"], password)
-            databases = list_databases(server)
+            db_name = choose_database(conn)
         except Exception as e:
             print(f"❌ Error connecting to server: {e}")
+            pool.release(conn)
             return
         
-        if not databases:
-            print("❌ No databases found")
-            server.close()
+        if not db_name:
+            pool.release(conn)
             return
         
-        print("\nAvailable Databases:")
-        for i, db in enumerate(databases, 1):
-            print(f"{i}. {db}")
-        
-        while True:
-            choice = input("Choose database number: ").strip()
-            if choice.isdigit() and 1 <= int(choice) <= len(databases):
-                db_name = databases[int(choice) - 1]
-                break
-            print("⚠️ Invalid selection, try again")
-        
-        server.close()
-        
         try:
-            conn = connect_database(profile["host"], profile["user"], password, db_name)
+            pool.switch(conn, db_name)
             print(f"✔ Connected to database: {db_name}")
-            schema = get_database_schema(conn)
+            schema = load_schema(config, profile, conn)
         except Exception as e:
             print(f"❌ Error connecting to database: {e}")
+            pool.release(conn)
             return
     
-    conn.close()
+    pool.release(conn)
     print("SnapBase session closed")
 
 
+def choose_database(conn):
+    """List the server's databases and ask the user to pick one"""
+    from db.schema import list_databases
+
+    databases = list_databases(conn)
+    if not databases:
+        print("❌ No databases found")
+        return None
+    
+    print("\nAvailable Databases:")
+    for i, db in enumerate(databases, 1):
+        print(f"{i}. {db}")
+    
+    while True:
+        choice = input("Choose database number: ").strip()
+        if choice.isdigit() and 1 <= int(choice) <= len(databases):
+            return databases[int(choice) - 1]
+        print("⚠️ Invalid selection, try again")
+
+
+def load_schema(config, profile, conn, refresh=False):
+    """Load the current database schema, through the on-disk cache unless disabled"""
+    from db.schema import get_database_schema
+    from db.schema_cache import get_cached_schema
+
+    if config.get("schema_cache", True):
+        schema = get_cached_schema(conn, profile["host"], profile["user"], refresh=refresh)
+    else:
+        schema = get_database_schema(conn)
+    print(f"✔ Schema loaded: {schema.summary()}")
+    return schema
+
+
 def add_new_profile(config):
     """Add a new database profile"""
     print("\n" + "="*50)
@@ -364,6 +410,7 @@ def add_new_profile(config):
     
     # Test connection
     print("Testing connection...")
+    from db.connection import connect_server
     try:
         server = connect_server(host, user, password)
         server.close()
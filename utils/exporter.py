@@ -0,0 +1,162 @@
+import csv
+import datetime
+import decimal
+import gzip
+import json
+import os
+import sys
+import time
+
+EXPORT_FORMATS = ("csv", "jsonl", "parquet")
+EXPORT_BATCH_SIZE = 5000        # rows held in memory at a time
+PROGRESS_INTERVAL = 1.0         # seconds between rows/sec updates
+
+
+def _open_text(path):
+    """Text stream for path, gzip-compressed when it ends in .gz"""
+    if path.endswith(".gz"):
+        return gzip.open(path, "wt", encoding="utf-8", newline="")
+    return open(path, "w", encoding="utf-8", newline="")
+
+
+def _json_value(value):
+    if isinstance(value, (bytes, bytearray)):
+        return value.hex()
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    if isinstance(value, (datetime.date, datetime.datetime, datetime.time)):
+        return value.isoformat()
+    return str(value)
+
+
+class CsvWriter:
+    def __init__(self, path, columns, description):
+        self.file = _open_text(path)
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(columns)
+
+    def write(self, rows):
+        self.writer.writerows(
+            [v.hex() if isinstance(v, (bytes, bytearray)) else v for v in row] for row in rows
+        )
+
+    def close(self):
+        self.file.close()
+
+
+class JsonlWriter:
+    def __init__(self, path, columns, description):
+        self.file = _open_text(path)
+        self.columns = columns
+
+    def write(self, rows):
+        self.file.writelines(
+            json.dumps(dict(zip(self.columns, row)), default=_json_value, ensure_ascii=False) + "\n"
+            for row in rows
+        )
+
+    def close(self):
+        self.file.close()
+
+
+class ParquetWriter:
+    """One row group per batch; the schema comes from the cursor description.
+
+    Needs pyarrow. Compression is Parquet's own (``.gz`` paths use gzip
+    codec instead of wrapping the file).
+    """
+
+    def __init__(self, path, columns, description):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Parquet export needs pyarrow (pip install pyarrow)")
+        self.pa = pa
+        self.columns = columns
+        self.schema = pa.schema([(name, _arrow_type(pa, desc)) for name, desc in zip(columns, description)])
+        codec = "gzip" if path.endswith(".gz") else "snappy"
+        self.writer = pq.ParquetWriter(path, self.schema, compression=codec)
+
+    def write(self, rows):
+        arrays = []
+        for i, field in enumerate(self.schema):
+            values = [row[i] for row in rows]
+            if self.pa.types.is_string(field.type):
+                values = [None if v is None else (v if isinstance(v, str) else _json_value(v)) for v in values]
+            arrays.append(self.pa.array(values, type=field.type))
+        self.writer.write_table(self.pa.Table.from_arrays(arrays, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+
+def _arrow_type(pa, desc):
+    """Arrow type for a MySQL column from its cursor description entry"""
+    from mysql.connector import FieldType
+    from mysql.connector.constants import FieldFlag
+
+    type_code = desc[1]
+    if type_code in (FieldType.TINY, FieldType.SHORT, FieldType.LONG, FieldType.LONGLONG, FieldType.INT24):
+        # BIGINT UNSIGNED goes up to 2**64 - 1, past what int64 holds
+        if len(desc) > 7 and desc[7] & FieldFlag.UNSIGNED:
+            return pa.uint64() if type_code == FieldType.LONGLONG else pa.uint32()
+        return pa.int64()
+    if type_code == FieldType.YEAR:
+        return pa.int64()
+    if type_code in (FieldType.FLOAT, FieldType.DOUBLE):
+        return pa.float64()
+    if type_code in (FieldType.DATE, FieldType.NEWDATE):
+        return pa.date32()
+    if type_code in (FieldType.DATETIME, FieldType.TIMESTAMP):
+        return pa.timestamp("us")
+    if type_code == FieldType.TIME:
+        return pa.duration("us")
+    # DECIMAL stays text so no precision is lost; BLOBs are written as hex
+    return pa.string()
+
+
+WRITERS = {"csv": CsvWriter, "jsonl": JsonlWriter, "parquet": ParquetWriter}
+
+
+def export_result(result, fmt, path, batch_size=EXPORT_BATCH_SIZE):
+    """Stream an open QueryResult to a file batch by batch.
+
+    Only one batch is in memory at a time, so the size of the result does
+    not matter. Prints a rows/sec readout while writing and returns the
+    number of rows written; a partially written file is removed on error.
+    """
+    try:
+        writer = WRITERS[fmt](path, result.columns, result.description)
+    except BaseException:
+        result.close()
+        raise
+    rows = 0
+    reported = False
+    start = last_report = time.perf_counter()
+    try:
+        for batch in result.iter_batches(batch_size):
+            writer.write(batch)
+            rows += len(batch)
+            now = time.perf_counter()
+            if now - last_report >= PROGRESS_INTERVAL:
+                last_report = now
+                reported = True
+                sys.stdout.write(f"\r⏳ {rows:,} rows ({rows / (now - start):,.0f} rows/s)")
+                sys.stdout.flush()
+        if result.error:
+            raise RuntimeError(result.error.replace("❌ ", "", 1))
+    except BaseException:
+        writer.close()
+        result.close()
+        os.remove(path)
+        raise
+    writer.close()
+
+    elapsed = time.perf_counter() - start
+    size = os.path.getsize(path)
+    if reported:
+        print()
+    print(f"✔ Exported {rows:,} rows to {path} in {elapsed:.2f}s "
+          f"({rows / max(elapsed, 1e-9):,.0f} rows/s, {size / 1048576:.1f} MiB)")
+    return rows
@@ -1,4 +1,130 @@
-from tabulate import tabulate
+import decimal
+import shutil
+import sys
 
-def print_table(headers, rows):
-    print(tabulate(rows, headers=headers, tablefmt="grid"))
\ No newline at end of file
+SAMPLE_ROWS = 100       # rows inspected to size the columns
+MAX_CELL_WIDTH = 60     # widest a column gets before cells are elided
+MIN_CELL_WIDTH = 6      # narrowest a column is squeezed to fit the terminal
+ELLIPSIS = "…"
+
+
+def terminal_width():
+    return shutil.get_terminal_size((120, 24)).columns
+
+
+def cell_text(value):
+    """One-line text for a cell; line breaks and tabs would break the layout"""
+    if value is None:
+        return "NULL"
+    if isinstance(value, (bytes, bytearray)):
+        try:
+            value = value.decode("utf-8")
+        except UnicodeDecodeError:
+            return "0x" + value.hex()
+    text = str(value)
+    if "\n" in text or "\r" in text or "\t" in text:
+        text = text.replace("\r\n", "↵").replace("\n", "↵").replace("\r", "↵").replace("\t", " ")
+    return text
+
+
+def elide(text, width):
+    if len(text) <= width:
+        return text
+    return text[:max(width - 1, 0)] + ELLIPSIS
+
+
+def _is_number(value):
+    return isinstance(value, (int, float, decimal.Decimal)) and not isinstance(value, bool)
+
+
+class TableRenderer:
+    """Grid table written row batch by row batch.
+
+    Column widths come from the headers and a bounded sample of rows, are
+    capped at MAX_CELL_WIDTH and squeezed to the terminal width; longer
+    cells are elided. Nothing is buffered beyond the batch being written.
+    """
+
+    def __init__(self, headers, sample, width=None, out=None):
+        self.headers = [str(h) for h in headers]
+        self.out = out or sys.stdout
+        widths = [len(h) for h in self.headers]
+        for row in sample[:SAMPLE_ROWS]:
+            for i, value in enumerate(row):
+                widths[i] = max(widths[i], min(len(cell_text(value)), MAX_CELL_WIDTH))
+        self.widths = self._fit(widths, width or terminal_width())
+        self.rule = "+" + "+".join("-" * (w + 2) for w in self.widths) + "+"
+
+    @staticmethod
+    def _fit(widths, available):
+        """Shrink the widest columns until the table fits the terminal"""
+        widths = list(widths)
+        # Each column costs its width plus "| " and " " around it
+        while sum(widths) + 3 * len(widths) + 1 > available:
+            widest = max(range(len(widths)), key=widths.__getitem__)
+            if widths[widest] <= MIN_CELL_WIDTH:
+                break
+            widths[widest] -= 1
+        return widths
+
+    def _line(self, row, numbers=None):
+        cells = []
+        for i, width in enumerate(self.widths):
+            text = elide(cell_text(row[i]), width)
+            if numbers is not None and _is_number(row[i]):
+                cells.append(text.rjust(width))
+            else:
+                cells.append(text.ljust(width))
+        return "| " + " | ".join(cells) + " |"
+
+    def header(self):
+        self.out.write("\n".join((
+            self.rule,
+            self._line(self.headers),
+            self.rule.replace("-", "=")
+        )) + "\n")
+
+    def write(self, rows):
+        if rows:
+            self.out.write("\n".join(self._line(row, numbers=True) for row in rows) + "\n")
+            self.out.flush()
+
+    def footer(self):
+        self.out.write(self.rule + "\n")
+        self.out.flush()
+
+
+def print_vertical(headers, rows, start=1, out=None):
+    """MySQL ``\\G`` layout: one ``column: value`` line per field, full values"""
+    out = out or sys.stdout
+    headers = [str(h) for h in headers]
+    label = max((len(h) for h in headers), default=0)
+    lines = []
+    for number, row in enumerate(rows, start):
+        lines.append(f"{'*' * 27} {number}. row {'*' * 27}")
+        for name, value in zip(headers, row):
+            text = "NULL" if value is None else str(value)
+            lines.append(f"{name.rjust(label)}: {text}")
+    if lines:
+        out.write("\n".join(lines) + "\n")
+        out.flush()
+
+
+def print_batches(headers, batches, vertical=False, start=1):
+    """Render rows as they arrive; widths are taken from the first batch"""
+    renderer = None
+    for batch in batches:
+        if vertical:
+            print_vertical(headers, batch, start)
+            start += len(batch)
+            continue
+        if renderer is None:
+            renderer = TableRenderer(headers, batch)
+            renderer.header()
+        renderer.write(batch)
+    if renderer is not None:
+        renderer.footer()
+
+
+def print_table(headers, rows, vertical=False, start=1):
+    print_batches(headers, [rows], vertical, start)
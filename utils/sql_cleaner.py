@@ -1,5 +1,12 @@
 import re
 
+from utils.sql_lexer import tokenize_sql
+
+SQL_KEYWORDS = ("select", "show", "describe", "desc", "explain")
+
+_FENCE_RE = re.compile(r"```sql\s*", re.IGNORECASE)
+
+
 def extract_sql(text: str) -> str | None:
     if not text:
         return None
@@ -9,10 +16,85 @@ def extract_sql(text: str) -> str | None:
     if match:
         return match.group(1).strip()
 
+    # Case 1b: block cut off after a complete statement (streaming cutoff)
+    match = re.search(r"```sql\s*(.*;)\s*$", text, re.DOTALL | re.IGNORECASE)
+    if match:
+        return match.group(1).strip()
+
     # Case 2: Starts directly with SQL keyword
     text = text.strip()
-    for kw in ("select", "show", "describe", "desc", "explain"):
+    for kw in SQL_KEYWORDS:
         if text.lower().startswith(kw):
             return text
 
     return None
+
+
+def _statement_end(text):
+    """Index just past the first top-level ';' in text, or None"""
+    for token in tokenize_sql(text):
+        if token.kind == "punct" and token.text == ";":
+            return token.end
+    return None
+
+
+class SqlStreamExtractor:
+    """Incremental extract_sql for streamed LLM output.
+
+    feed() returns True as soon as the text holds a complete statement (a
+    ';' outside quotes and comments) or a closed ```sql block, so the caller
+    can stop reading; text then ends at that point.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self.complete = False
+
+    def feed(self, chunk):
+        if self.complete:
+            return True
+        self.text += chunk
+
+        fence = _FENCE_RE.search(self.text)
+        if fence:
+            body = self.text[fence.end():]
+            close = body.find("```")
+            end = _statement_end(body[:close] if close >= 0 else body)
+            if end is not None:
+                self.text = self.text[:fence.end() + end]
+                self.complete = True
+            elif close >= 0:
+                self.text = self.text[:fence.end() + close + 3]
+                self.complete = True
+            return self.complete
+
+        stripped = self.text.lstrip()
+        if stripped.lower().startswith(SQL_KEYWORDS):
+            end = _statement_end(stripped)
+            if end is not None:
+                self.text = stripped[:end]
+                self.complete = True
+        return self.complete
+
+    def sql(self):
+        return extract_sql(self.text)
+
+
+def collect_sql_stream(chunks, on_token=None, cancel=None):
+    """Read text chunks until a complete SQL statement has arrived.
+
+    Returns the text received up to the cutoff; the rest of the stream is
+    left unread so the caller can close it. Setting the ``cancel`` event
+    (a threading.Event) stops reading at the next chunk.
+    """
+    extractor = SqlStreamExtractor()
+    for chunk in chunks:
+        if cancel is not None and cancel.is_set():
+            break
+        if not chunk:
+            continue
+        if on_token is not None:
+            on_token(chunk)
+        if extractor.feed(chunk):
+            break
+    return extractor.text
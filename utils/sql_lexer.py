@@ -0,0 +1,209 @@
+import re
+
+_NUMBER_RE = re.compile(r"\d+(?:\.\d*)?(?:[eE][+-]?\d+)?|\.\d+(?:[eE][+-]?\d+)?")
+_WORD_RE = re.compile(r"[A-Za-z_$][\w$]*")
+
+
+class Token:
+    """One lexical unit of a SQL statement with its position in the source"""
+
+    __slots__ = ("kind", "text", "start", "end")
+
+    def __init__(self, kind, text, start, end):
+        self.kind = kind
+        self.text = text
+        self.start = start
+        self.end = end
+
+    @property
+    def upper(self):
+        return self.text.upper()
+
+    @property
+    def value(self):
+        """Unquoted content of a string literal or quoted identifier"""
+        if self.kind not in ("string", "quoted_ident"):
+            return self.text
+        quote = self.text[0]
+        body = self.text[1:-1] if self.text.endswith(quote) and len(self.text) > 1 else self.text[1:]
+        body = body.replace(quote * 2, quote)
+        if quote != "`":
+            body = re.sub(r"\\(.)", r"\1", body)
+        return body
+
+    def __repr__(self):
+        return f"Token({self.kind}, {self.text!r})"
+
+
+def _quoted_end(sql, i, quote):
+    """Index just past the closing quote starting at sql[i]"""
+    j = i + 1
+    n = len(sql)
+    while j < n:
+        c = sql[j]
+        if c == "\\" and quote != "`":
+            j += 2
+            continue
+        if c == quote:
+            if j + 1 < n and sql[j + 1] == quote:
+                j += 2
+                continue
+            return j + 1
+        j += 1
+    return n
+
+
+def tokenize_sql(sql, keep_whitespace=False):
+    """Split MySQL text into tokens.
+
+    Kinds: ``string``, ``quoted_ident`` (backticks), ``number``, ``word``
+    (keywords and bare identifiers), ``comment``, ``punct`` and, when
+    keep_whitespace is set, ``ws``.
+    """
+    tokens = []
+    i = 0
+    n = len(sql)
+    while i < n:
+        c = sql[i]
+        if c.isspace():
+            j = i + 1
+            while j < n and sql[j].isspace():
+                j += 1
+            if keep_whitespace:
+                tokens.append(Token("ws", sql[i:j], i, j))
+        elif c in "'\"":
+            j = _quoted_end(sql, i, c)
+            tokens.append(Token("string", sql[i:j], i, j))
+        elif c == "`":
+            j = _quoted_end(sql, i, c)
+            tokens.append(Token("quoted_ident", sql[i:j], i, j))
+        elif c == "#" or sql.startswith("-- ", i) or sql.startswith("--\n", i) or (sql.startswith("--", i) and i + 2 == n):
+            j = sql.find("\n", i)
+            j = n if j == -1 else j
+            tokens.append(Token("comment", sql[i:j], i, j))
+        elif sql.startswith("/*", i):
+            j = sql.find("*/", i + 2)
+            j = n if j == -1 else j + 2
+            tokens.append(Token("comment", sql[i:j], i, j))
+        elif c.isdigit() or (c == "." and i + 1 < n and sql[i + 1].isdigit()):
+            match = _NUMBER_RE.match(sql, i)
+            j = match.end()
+            if j < n and (sql[j].isalpha() or sql[j] in "_$"):
+                # Identifiers may start with digits in MySQL (e.g. 2fa_codes)
+                j = _WORD_RE.match(sql, j).end()
+                tokens.append(Token("word", sql[i:j], i, j))
+            else:
+                tokens.append(Token("number", sql[i:j], i, j))
+        elif c.isalpha() or c in "_$":
+            j = _WORD_RE.match(sql, i).end()
+            tokens.append(Token("word", sql[i:j], i, j))
+        else:
+            j = i + 1
+            for op in ("<=>", "<=", ">=", "<>", "!=", ":=", "||", "&&", "->>", "->"):
+                if sql.startswith(op, i):
+                    j = i + len(op)
+                    break
+            tokens.append(Token("punct", sql[i:j], i, j))
+        i = j
+    return tokens
+
+
+def code_tokens(sql):
+    """Tokens without comments, the form most rewriting and analysis wants"""
+    return [t for t in tokenize_sql(sql) if t.kind != "comment"]
+
+
+def split_statements(sql):
+    """Split text on top-level ';' (not inside quotes or comments)"""
+    statements = []
+    start = 0
+    for token in tokenize_sql(sql):
+        if token.kind == "punct" and token.text == ";":
+            statements.append(sql[start:token.start])
+            start = token.end
+    statements.append(sql[start:])
+    return [s.strip() for s in statements if s.strip()]
+
+
+_READ_STATEMENTS = {"SELECT", "SHOW", "DESCRIBE", "DESC", "EXPLAIN", "WITH"}
+# Words that make an otherwise read-looking statement write or lock:
+# SELECT ... INTO, WITH ... UPDATE/DELETE, FOR UPDATE, LOCK IN SHARE MODE
+_WRITE_WORDS = {"INTO", "INSERT", "UPDATE", "DELETE", "REPLACE", "LOCK", "SHARE", "NOWAIT"}
+# Reads whose answer depends on what ran earlier in the same session
+_SESSION_WORDS = {"LAST_INSERT_ID", "FOUND_ROWS", "ROW_COUNT", "SQL_CALC_FOUND_ROWS", "CONNECTION_ID"}
+
+
+def is_read_only(sql):
+    """True for statements that neither write nor take locks"""
+    words = [t.upper for t in code_tokens(sql) if t.kind == "word"]
+    if not words or words[0] not in _READ_STATEMENTS:
+        return False
+    return not any(word in _WRITE_WORDS for word in words)
+
+
+def uses_session_state(sql):
+    """True when a statement reads user variables or per-session results"""
+    for token in code_tokens(sql):
+        if token.kind == "punct" and token.text == "@":
+            return True
+        if token.kind == "word" and token.upper in _SESSION_WORDS:
+            return True
+    return False
+
+
+# Words that end a table reference, so they are never taken for an alias
+_CLAUSE_WORDS = {
+    "WHERE", "JOIN", "ON", "USING", "INNER", "LEFT", "RIGHT", "CROSS", "OUTER", "NATURAL",
+    "STRAIGHT_JOIN", "GROUP", "ORDER", "HAVING", "LIMIT", "UNION", "WINDOW", "FOR", "LOCK",
+    "INTO", "USE", "FORCE", "IGNORE", "PARTITION", "SET", "VALUES", "SELECT", "AS", "EXCEPT",
+    "INTERSECT", "LATERAL",
+}
+
+
+def table_references(sql, qualified=False):
+    """Tables named after FROM/JOIN/UPDATE/INTO (and comma lists), by alias.
+
+    Returns ``{alias_or_name: table}``; every table also maps to itself.
+    With qualified, ``db.table`` references keep their database prefix.
+    Derived tables and CTE names are included as written, so callers that
+    check against a schema should ignore names they do not know.
+    """
+    tokens = code_tokens(sql)
+    refs = {}
+    i = 0
+    in_from = False
+    while i < len(tokens):
+        token = tokens[i]
+        upper = token.upper if token.kind == "word" else ""
+        starts = upper in ("FROM", "JOIN", "UPDATE", "INTO", "STRAIGHT_JOIN") or (
+            in_from and token.kind == "punct" and token.text == ",")
+        if upper == "FROM":
+            in_from = True
+        elif upper in _CLAUSE_WORDS - {"JOIN", "STRAIGHT_JOIN", "INNER", "LEFT", "RIGHT", "CROSS",
+                                       "OUTER", "NATURAL", "ON", "USING", "AS"}:
+            in_from = False
+        if not starts or i + 1 >= len(tokens) or tokens[i + 1].kind not in ("word", "quoted_ident"):
+            i += 1
+            continue
+
+        # [db.]table
+        j = i + 1
+        name = tokens[j].value
+        while j + 2 < len(tokens) and tokens[j + 1].text == "." and tokens[j + 2].kind in ("word", "quoted_ident"):
+            j += 2
+            name = f"{name}.{tokens[j].value}" if qualified else tokens[j].value
+        if tokens[j].kind == "word" and tokens[j].upper in _CLAUSE_WORDS:
+            i += 1
+            continue
+        refs[name] = name
+
+        # [AS] alias
+        k = j + 1
+        if k < len(tokens) and tokens[k].upper == "AS":
+            k += 1
+        if k < len(tokens) and tokens[k].kind in ("word", "quoted_ident") and (
+                tokens[k].kind == "quoted_ident" or tokens[k].upper not in _CLAUSE_WORDS):
+            refs[tokens[k].value] = name
+            j = k
+        i = j + 1
+    return refs
@@ -0,0 +1,156 @@
+from utils.sql_lexer import code_tokens, tokenize_sql, is_read_only
+
+# MySQL has no "LIMIT all"; this is the documented way to give only an OFFSET
+MAX_LIMIT = 18446744073709551615
+
+
+def _top_level_limit(tokens):
+    """``(limit_index, offset, count, last_index)`` of the statement's own LIMIT.
+
+    Returns ``(None, 0, None, None)`` when there is none, or None when the
+    statement can't safely be windowed (INTO, locking reads, a LIMIT with
+    placeholders or variables).
+    """
+    depth = 0
+    limit_at = None
+    for i, token in enumerate(tokens):
+        if token.kind == "punct" and token.text == "(":
+            depth += 1
+        elif token.kind == "punct" and token.text == ")":
+            depth -= 1
+        elif depth == 0 and token.kind == "word":
+            if token.upper in ("INTO", "FOR", "LOCK"):
+                return None
+            if token.upper == "LIMIT":
+                limit_at = i
+    if limit_at is None:
+        return None, 0, None, None
+
+    args = tokens[limit_at + 1:limit_at + 4]
+    if not args or not args[0].text.isdigit():
+        return None
+    first = int(args[0].text)
+    if len(args) >= 3 and args[1].text == "," and args[2].text.isdigit():
+        return limit_at, first, int(args[2].text), limit_at + 3
+    if len(args) >= 3 and args[1].upper == "OFFSET" and args[2].text.isdigit():
+        return limit_at, int(args[2].text), first, limit_at + 3
+    if len(args) >= 2 and (args[1].text == "," or args[1].upper == "OFFSET"):
+        return None
+    return limit_at, 0, first, limit_at + 1
+
+
+def window_sql(sql, start=0, count=None):
+    """Rewrite a SELECT to return ``count`` rows starting at row ``start``.
+
+    The window is taken within whatever the statement already selects: an
+    existing top-level LIMIT/OFFSET is tightened, never widened, and LIMITs
+    inside subqueries, CTEs or parenthesised UNION branches are left alone
+    (a trailing LIMIT after a UNION applies to the whole UNION, as in MySQL).
+
+    Returns ``(new_sql, cut)``: cut is True when the statement would have
+    returned more rows than the window. new_sql is None for statements that
+    are not plain reads.
+    """
+    tokens = code_tokens(sql)
+    while tokens and tokens[-1].kind == "punct" and tokens[-1].text == ";":
+        tokens.pop()
+    words = [t.upper for t in tokens if t.kind == "word"]
+    if not words or words[0] not in ("SELECT", "WITH"):
+        return None, False
+
+    found = _top_level_limit(tokens)
+    if found is None:
+        return None, False
+    limit_at, offset, limit, last_at = found
+
+    remaining = None if limit is None else max(limit - start, 0)
+    if count is None:
+        new_count = remaining
+    else:
+        new_count = count if remaining is None else min(count, remaining)
+    cut = count is not None and (remaining is None or remaining > count)
+
+    new_offset = offset + start
+    if limit_at is not None and new_offset == offset and new_count == limit:
+        return sql, False
+
+    clause = f"LIMIT {MAX_LIMIT if new_count is None else new_count}"
+    if new_offset:
+        clause += f" OFFSET {new_offset}"
+    if limit_at is None:
+        end = tokens[-1].end
+        return f"{sql[:end]} {clause}{sql[end:]}", cut
+    return sql[:tokens[limit_at].start] + clause + sql[tokens[last_at].end:], cut
+
+
+def statement_limit(sql):
+    """Row count of the statement's top-level LIMIT, or None"""
+    tokens = code_tokens(sql)
+    found = _top_level_limit(tokens) if tokens else None
+    return found[2] if found else None
+
+
+def with_time_limit(sql, ms):
+    """SELECT with a ``MAX_EXECUTION_TIME(ms)`` optimizer hint, or None.
+
+    The server only honours the hint right after the first SELECT of a
+    read-only SELECT, so other statements get None and need a client-side
+    watchdog. A hint comment already there is extended (only one counts),
+    and a MAX_EXECUTION_TIME the statement sets itself is kept.
+    """
+    tokens = tokenize_sql(sql)
+    code = [t for t in tokens if t.kind != "comment"]
+    if not code or code[0].upper != "SELECT" or not is_read_only(sql):
+        return None
+    i = tokens.index(code[0])
+    after = tokens[i + 1] if i + 1 < len(tokens) else None
+    if after is not None and after.kind == "comment" and after.text.startswith("/*+"):
+        if "MAX_EXECUTION_TIME" in after.upper:
+            return sql
+        end = after.end - 2
+        return f"{sql[:end].rstrip()} MAX_EXECUTION_TIME({ms}) {sql[end:]}"
+    at = code[0].end
+    return f"{sql[:at]} /*+ MAX_EXECUTION_TIME({ms}) */{sql[at:]}"
+
+
+_AGGREGATES = {"COUNT", "SUM", "AVG", "MIN", "MAX", "GROUP_CONCAT", "JSON_ARRAYAGG", "JSON_OBJECTAGG",
+               "BIT_AND", "BIT_OR", "BIT_XOR", "STD", "STDDEV", "STDDEV_POP", "STDDEV_SAMP",
+               "VAR_POP", "VAR_SAMP", "VARIANCE"}
+
+
+def _top_level_words(tokens):
+    """Upper-cased words outside parentheses, with the token that follows each"""
+    depth = 0
+    words = []
+    for i, token in enumerate(tokens):
+        if token.kind == "punct" and token.text == "(":
+            depth += 1
+        elif token.kind == "punct" and token.text == ")":
+            depth -= 1
+        elif depth == 0 and token.kind == "word":
+            words.append((token.upper, tokens[i + 1] if i + 1 < len(tokens) else None))
+    return words
+
+
+def has_order_by(sql):
+    """True when the statement itself (not a subquery) has an ORDER BY"""
+    words = [word for word, _ in _top_level_words(code_tokens(sql))]
+    return any(word == "ORDER" and following == "BY" for word, following in zip(words, words[1:]))
+
+
+def returns_one_row(sql):
+    """True for a SELECT that can return at most one row.
+
+    That is a SELECT without FROM, or one whose select list aggregates
+    (COUNT(), SUM(), ...) with no GROUP BY, window function or UNION.
+    A LIMIT can't cut such a result short.
+    """
+    words = _top_level_words(code_tokens(sql))
+    names = [word for word, _ in words]
+    if not names or names[0] != "SELECT" or {"GROUP", "UNION", "OVER", "WINDOW"} & set(names):
+        return False
+    if "FROM" not in names:
+        return True
+    select_list = words[:names.index("FROM")]
+    return any(word in _AGGREGATES and following is not None and following.text == "("
+               for word, following in select_list)